@@ -13,7 +13,33 @@
     See the License for the specific language governing permissions and
     limitations under the License.
 """
-from geedim.collection import MaskedCollection
+import importlib
+import sys
+
 from geedim.enums import CloudMaskMethod, CompositeMethod, ResamplingMethod
-from geedim.mask import MaskedImage
-from geedim.utils import Initialize
+
+# public objects that are imported lazily from their modules on first access, so that `import geedim` (and the CLI)
+# does not import ee, rasterio, numpy etc. until they are needed
+_lazy_objects = dict(MaskedCollection='geedim.collection', MaskedImage='geedim.mask', Initialize='geedim.utils')
+
+__all__ = ['MaskedCollection', 'MaskedImage', 'Initialize', 'CloudMaskMethod', 'CompositeMethod', 'ResamplingMethod']
+
+
+def __getattr__(name: str):
+    """ Import lazy objects on first access. """
+    if name in _lazy_objects:
+        obj = getattr(importlib.import_module(_lazy_objects[name]), name)
+        globals()[name] = obj
+        return obj
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_lazy_objects.keys()))
+
+
+if sys.version_info < (3, 7):
+    # module __getattr__ is not supported before python 3.7
+    from geedim.collection import MaskedCollection
+    from geedim.mask import MaskedImage
+    from geedim.utils import Initialize
@@ -0,0 +1,125 @@
+"""
+    Copyright 2021 Dugal Harris - dugalh@gmail.com
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def cache_dir() -> pathlib.Path:
+    """
+    Return the geedim cache directory.  This is ``$GEEDIM_CACHE_DIR`` if it is set, otherwise
+    ``$XDG_CACHE_HOME/geedim``, or ``~/.cache/geedim``.
+    """
+    if os.environ.get('GEEDIM_CACHE_DIR'):
+        return pathlib.Path(os.environ['GEEDIM_CACHE_DIR'])
+    root = os.environ.get('XDG_CACHE_HOME') or pathlib.Path.home().joinpath('.cache')
+    return pathlib.Path(root).joinpath('geedim')
+
+
+class DiskCache:
+
+    def __init__(self, name: str, ttl: Optional[float] = None, max_items: Optional[int] = None):
+        """
+        A small, thread-safe, persistent key-value store of JSON serialisable values, backed by an sqlite database in
+        the geedim :func:`cache_dir`.
+
+        The cache is best effort: database errors (e.g. a read-only file system) are logged, and treated as cache
+        misses.
+
+        Parameters
+        ----------
+        name: str
+            Cache name.  Used for the database filename.
+        ttl: float, optional
+            Time to live (s) of cache items.  If None, items don't expire.
+        max_items: int, optional
+            Maximum number of items to keep.  The least recently set items are removed beyond this number.  If None,
+            the number of items is not limited.
+        """
+        self._name = name
+        self._ttl = ttl
+        self._max_items = max_items
+        self._lock = threading.Lock()
+
+    @property
+    def filename(self) -> pathlib.Path:
+        """ Path of the cache database. """
+        return cache_dir().joinpath(f'{self._name}.sqlite')
+
+    def _connect(self) -> sqlite3.Connection:
+        """ Return a connection to the cache database, creating it if it does not exist. """
+        filename = self.filename
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(filename), timeout=10)
+        conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, time REAL)')
+        return conn
+
+    def get(self, key: str, default: Any = None, ttl: Optional[float] = None) -> Any:
+        """
+        Return the value of the cache item with `key`, or `default` if it does not exist or has expired.  `ttl`
+        overrides the cache time to live for this call.
+        """
+        try:
+            with self._lock, closing(self._connect()) as conn:
+                row = conn.execute('SELECT value, time FROM cache WHERE key = ?', (key,)).fetchone()
+        except (sqlite3.Error, OSError) as ex:
+            logger.debug(f'Could not read from {self._name} cache: {str(ex)}')
+            return default
+
+        ttl = ttl if ttl is not None else self._ttl
+        if (row is None) or ((ttl is not None) and (time.time() - row[1] > ttl)):
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """ Set the value of the cache item with `key`. """
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO cache (key, value, time) VALUES (?, ?, ?)',
+                    (key, json.dumps(value), time.time())
+                )
+                if self._max_items:
+                    conn.execute(
+                        'DELETE FROM cache WHERE key NOT IN (SELECT key FROM cache ORDER BY time DESC LIMIT ?)',
+                        (self._max_items,)
+                    )
+        except (sqlite3.Error, OSError) as ex:
+            logger.debug(f'Could not write to {self._name} cache: {str(ex)}')
+
+    def delete(self, key: str):
+        """ Remove the cache item with `key`, if it exists. """
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+        except (sqlite3.Error, OSError) as ex:
+            logger.debug(f'Could not delete from {self._name} cache: {str(ex)}')
+
+    def clear(self):
+        """ Remove all cache items. """
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute('DELETE FROM cache')
+        except (sqlite3.Error, OSError) as ex:
+            logger.debug(f'Could not clear {self._name} cache: {str(ex)}')
@@ -19,19 +19,20 @@ import os
 import pathlib
 import re
 import sys
+from contextlib import ExitStack
 from types import SimpleNamespace
-from typing import List
+from typing import Dict, Iterator, List, Optional, TextIO, TYPE_CHECKING
 
 import click
-import rasterio.crs as rio_crs
 from click.core import ParameterSource
-from geedim import schema, Initialize, version
-from geedim.collection import MaskedCollection
-from geedim.download import BaseImage, supported_dtypes
-from geedim.enums import CloudMaskMethod, CompositeMethod, ResamplingMethod
-from geedim.mask import MaskedImage
-from geedim.utils import get_bounds, Spinner
-from rasterio.errors import CRSError
+from geedim import version
+from geedim.enums import CloudMaskMethod, CompositeMethod, ResamplingMethod, supported_dtypes
+
+if TYPE_CHECKING:
+    from geedim.mask import MaskedImage
+
+# Note: heavy dependencies (ee, rasterio, numpy etc.) are imported where they are used, rather than at module level,
+# so that they do not delay `--help` and other commands that don't need them.
 
 logger = logging.getLogger(__name__)
 
@@ -78,7 +79,15 @@ class ChainedCommand(click.Command):
         """Manage shared `image_list` and `region` parameters."""
 
         # initialise earth engine (do it here, rather than in cli() so that it does not delay --help)
+        from geedim.collection import MaskedCollection
+        from geedim.download import BaseImage
+        from geedim.stac import StacCatalog
+        from geedim.utils import Initialize
         Initialize()
+        BaseImage.enable_info_cache(ctx.obj.cache)
+        BaseImage.enable_tile_limit_cache(ctx.obj.cache)
+        MaskedCollection.enable_search_cache(ctx.obj.cache)
+        StacCatalog().enable_cache(ctx.obj.cache)
 
         # combine `region` and `bbox` into a single region in the context object
         region = ctx.params['region'] if 'region' in ctx.params else None
@@ -112,6 +121,7 @@ def _configure_logging(verbosity):
 
 def _collection_cb(ctx, param, value):
     """click callback to validate collection name"""
+    from geedim import schema
     if value in schema.gd_to_ee:
         value = schema.gd_to_ee[value]
     return value
@@ -119,6 +129,8 @@ def _collection_cb(ctx, param, value):
 
 def _crs_cb(ctx, param, crs):
     """click callback to validate and parse the CRS."""
+    import rasterio.crs as rio_crs
+    from rasterio.errors import CRSError
     if crs is not None:
         try:
             wkt_fn = pathlib.Path(crs)
@@ -151,6 +163,7 @@ def _region_cb(ctx, param, value):
             with click.open_file(value, encoding='utf-8') as f:
                 value = json.load(f)
         else:
+            from geedim.utils import get_bounds
             value = get_bounds(value, expand=10)
     elif value is not None and len(value) != 0:
         raise click.BadParameter(f'Invalid region: {filename}.', param=param)
@@ -172,8 +185,23 @@ def _comp_method_cb(ctx, param, value):
     return CompositeMethod(value) if value else None
 
 
-def _prepare_image_list(obj: SimpleNamespace, mask=False) -> List[MaskedImage, ]:
+def _shard_days_cb(ctx, param, value):
+    """click callback to validate and parse --shard-days"""
+    if value is None or value == 'auto':
+        return value
+    try:
+        shard_days = int(value)
+    except ValueError:
+        shard_days = 0
+    if shard_days < 1:
+        raise click.BadParameter(f'Invalid shard days: {value}.  Should be a positive integer or "auto".', param=param)
+    return shard_days
+
+
+def _prepare_image_list(obj: SimpleNamespace, mask=False) -> List['MaskedImage', ]:
     """Validate and prepare the obj.image_list for export/download.  Returns a list of MaskedImage objects."""
+    from geedim.download import BaseImage
+    from geedim.mask import MaskedImage
     if len(obj.image_list) == 0:
         raise click.BadOptionUsage(
             'image_id', 'Either pass --id, or chain this command with a successful `search` or `composite`'
@@ -189,6 +217,8 @@ def _prepare_image_list(obj: SimpleNamespace, mask=False) -> List[MaskedImage, ]
             raise ValueError(f'Unsupported image object type: {type(im_obj)}')
         image_list.append(im_obj)
 
+    # fetch image metadata in batches, rather than one image at a time
+    BaseImage.prefetch_info(image_list)
     if obj.region is None and any([not im.has_fixed_projection for im in image_list]):
         raise click.BadOptionUsage('region', 'One of --region or --bbox is required for a composite image.')
     return image_list
@@ -217,13 +247,13 @@ dtype_option = click.option(
     help='Data type to convert image(s) to.'
 )
 mask_option = click.option(
-    '-m/-nm', '--mask/--no-mask', default=MaskedImage._default_mask, show_default=True,
+    '-m/-nm', '--mask/--no-mask', default=False, show_default=True,
     help='Whether to apply cloud/shadow mask(s); or fill mask(s), in the case of images without '
     'support for cloud/shadow masking.'
 )
 resampling_option = click.option(
     '-rs', '--resampling', type=click.Choice([rm.value for rm in ResamplingMethod], case_sensitive=True),
-    default=BaseImage._default_resampling.value, show_default=True, callback=_resampling_method_cb,
+    default=ResamplingMethod.near.value, show_default=True, callback=_resampling_method_cb,
     help='Resampling method.'
 )
 scale_offset_option = click.option(
@@ -236,11 +266,16 @@ scale_offset_option = click.option(
 @click.group(chain=True)
 @click.option('--verbose', '-v', count=True, help="Increase verbosity.")
 @click.option('--quiet', '-q', count=True, help="Decrease verbosity.")
+@click.option(
+    '--cache/--no-cache', default=False, show_default=True, envvar='GEEDIM_CACHE',
+    help='Cache Earth Engine image metadata, search results, STAC data and learned download tile size limits on disk, '
+    'to speed up repeated runs with the same images and searches.'
+)
 @click.version_option(version=version.__version__, message='%(version)s')
 @click.pass_context
-def cli(ctx, verbose, quiet):
+def cli(ctx, verbose, quiet, cache):
     """ Search, composite and download Google Earth Engine imagery. """
-    ctx.obj = SimpleNamespace(image_list=[], region=None, cloud_kwargs={})
+    ctx.obj = SimpleNamespace(image_list=[], region=None, cloud_kwargs={}, cache=cache)
     verbosity = verbose - quiet
     _configure_logging(verbosity)
 
@@ -385,10 +420,30 @@ cli.add_command(config)
     '-op', '--output', type=click.Path(exists=False, dir_okay=False, writable=True), default=None,
     help='JSON file to write search results to.'
 )
+@click.option(
+    '-ps', '--page-size', type=click.IntRange(min=1), default=500, show_default=True,
+    help='Number of search results to retrieve, display and write at a time.'
+)
+@click.option(
+    '-mcc', '--max-cloud-cover', type=click.FloatRange(min=0, max=100), default=None,
+    help='Maximum scene-level cloud cover (%) from the image metadata.  Cloudy scenes are excluded before the '
+    'region statistics are found, which speeds up the search.  Supported for cloud/shadow maskable collections.'
+)
+@click.option(
+    '-sd', '--shard-days', type=click.STRING, default=None, callback=_shard_days_cb,
+    help='Split the date range into shards of this many days, and search the shards concurrently.  Use "auto" to '
+    'choose the shard size from the collection revisit interval.'
+)
+@click.option(
+    '-ss', '--sample-size', type=click.IntRange(min=1), default=None,
+    help='Estimate the filled and cloud/shadow free portions from a random sample of this many points in the '
+    'region, rather than from all region pixels.  This speeds up searches of large regions.  95% confidence '
+    'intervals of the estimates are included in the search results.'
+)
 @click.pass_obj
 def search(
     obj, collection, start_date, end_date, bbox, region, fill_portion, cloudless_portion, custom_filter, output,
-    add_props
+    add_props, page_size, max_cloud_cover, shard_days, sample_size
 ):
     # @formatter:off
     """
@@ -435,6 +490,8 @@ def search(
         geedim search -c l8-c2-l2 -s 2022-01-01 -e 2022-05-01 --bbox 23 -34 23.2 -33.8 -cf "CLOUD_COVER_LAND<50" -ap CLOUD_COVER_LAND -ap CLOUD_COVER
     """
     # @formatter:on
+    from geedim.collection import MaskedCollection
+    from geedim.utils import Spinner
     if not obj.region and not start_date:
         raise click.BadOptionUsage(
             'start-date / region', 'Specify at least --start-time and/or a region with --region/--bbox'
@@ -448,24 +505,47 @@ def search(
     with Spinner(label=label, leave=' '):
         gd_collection = gd_collection.search(
             start_date, end_date, obj.region, fill_portion=fill_portion, cloudless_portion=cloudless_portion,
-            custom_filter=custom_filter, **obj.cloud_kwargs
+            custom_filter=custom_filter, shard_days=shard_days, max_cloud_cover=max_cloud_cover,
+            sample_size=sample_size, **obj.cloud_kwargs
         )
-        # retrieve search result properties from EE
-        num_images = gd_collection.properties
+        # retrieve the first page of search result properties from EE
+        pages = gd_collection.iter_properties(page_size=page_size)
+        page = next(pages, None)
 
-    if num_images == 0:
+    if not page:
         logger.info('No images found\n')
     else:
-        obj.image_list += list(gd_collection.properties.keys())  # store image ids for chained commands
-        logger.info(f'{len(gd_collection.properties)} images found\n')
         logger.info(f'Image property descriptions:\n\n{gd_collection.schema_table}\n')
-        logger.info(f'Search Results:\n\n{gd_collection.properties_table}')
-
-    # write results to file
-    if output is not None:
-        output = pathlib.Path(output)
-        with open(output, 'w', encoding='utf8', newline='') as f:
-            json.dump(gd_collection.properties, f)
+        logger.info('Search Results:\n')
+
+    num_images = 0
+
+    def iter_pages(page: Dict[str, Dict], f: Optional[TextIO]) -> Iterator[Dict[str, Dict]]:
+        """ Yield the first and remaining pages, storing their image ids and writing them to the output file. """
+        nonlocal num_images
+        while page:
+            obj.image_list += list(page.keys())  # store image ids for chained commands
+            if f:
+                # write a '"<id>": {<properties>}' member for each image, giving a valid JSON object once the closing
+                # brace is written
+                f.write(', ' if num_images > 0 else '')
+                f.write(', '.join([f'{json.dumps(im_id)}: {json.dumps(im_props)}' for im_id, im_props in page.items()]))
+            num_images += len(page)
+            yield page
+            page = next(pages, None)
+
+    # display and write results page by page, as they are retrieved
+    with ExitStack() as stack:
+        f = None
+        if output is not None:
+            f = stack.enter_context(open(pathlib.Path(output), 'w', encoding='utf8', newline=''))
+            f.write('{')
+            stack.callback(f.write, '}')
+        for table_rows in gd_collection.iter_properties_table(iter_pages(page, f)):
+            logger.info(table_rows)
+
+    if num_images > 0:
+        logger.info(f'\n{num_images} images found\n')
 
 
 cli.add_command(search)
@@ -487,16 +567,28 @@ cli.add_command(search)
 @resampling_option
 @scale_offset_option
 @click.option(
-    '-mts', '--max-tile-size', type=click.FLOAT, default=BaseImage._ee_max_tile_size, show_default=True,
+    '-mts', '--max-tile-size', type=click.FLOAT, default=None, show_default='32',
     help='Maximum download tile size (MB).'
 )
 @click.option(
-    '-mtd', '--max-tile-dim', type=click.INT, default=BaseImage._ee_max_tile_dim, show_default=True,
+    '-mtd', '--max-tile-dim', type=click.INT, default=None, show_default='10000',
     help='Maximum download tile dimension (pixels).'
 )
 @click.option('-o', '--overwrite', is_flag=True, default=False, help='Overwrite the destination file if it exists.')
+@click.option(
+    '-dr', '--dry-run', is_flag=True, default=False,
+    help='Print download plan(s) as JSON, without downloading.  Plans include the tile shape, number of tiles & '
+    'requests, raw & estimated compressed sizes, and estimated download time.'
+)
+@click.option(
+    '-tp', '--throughput', type=click.FLOAT, default=10., show_default=True,
+    help='Expected download throughput (MB/s) for estimating the download time with ``--dry-run``.'
+)
 @click.pass_obj
-def download(obj, image_id, bbox, region, download_dir, mask, max_tile_size, max_tile_dim, overwrite, **kwargs):
+def download(
+    obj, image_id, bbox, region, download_dir, mask, max_tile_size, max_tile_dim, overwrite, dry_run, throughput,
+    **kwargs
+):  # yapf: disable
     # @formatter:off
     """
     Download image(s).
@@ -542,11 +634,26 @@ def download(obj, image_id, bbox, region, download_dir, mask, max_tile_size, max
     Download the results of a MODIS NBAR search, specifying a CRS and scale to reproject to::
 
         geedim search -c MODIS/006/MCD43A4 -s 2022-01-01 -e 2022-01-03 --bbox 23 -34 24 -33 download --crs EPSG:3857 --scale 500
+
+    Print the download plan for a Sentinel-2 image, without downloading::
+
+        geedim download -i COPERNICUS/S2_SR/20211004T080801_20211004T083709_T34HEJ --dry-run
     """
     # @formatter:on
+    image_list = _prepare_image_list(obj, mask=mask)
+    if dry_run:
+        plans = [
+            im.plan(
+                region=obj.region, max_tile_size=max_tile_size, max_tile_dim=max_tile_dim, throughput=throughput,
+                **kwargs
+            )
+            for im in image_list
+        ]  # yapf: disable
+        click.echo(json.dumps(plans, indent=2))
+        return
+
     logger.info('\nDownloading:\n')
     download_dir = download_dir or os.getcwd()
-    image_list = _prepare_image_list(obj, mask=mask)
     for im in image_list:
         filename = pathlib.Path(download_dir).joinpath(im.name + '.tif')
         im.download(
@@ -622,6 +729,7 @@ def export(obj, image_id, bbox, region, drive_folder, mask, wait, **kwargs):
         geedim search -c MODIS/006/MCD43A4 -s 2022-01-01 -e 2022-01-03 --bbox 23 -34 24 -33 export --crs EPSG:3857 --scale 500 -df geedim
     """
     # @formatter:on
+    from geedim.download import BaseImage
     logger.info('\nExporting:\n')
     image_list = _prepare_image_list(obj, mask=mask)
     export_tasks = []
@@ -656,7 +764,7 @@ cli.add_command(export)
 )
 @click.option(
     '-rs', '--resampling', type=click.Choice([rm.value for rm in ResamplingMethod], case_sensitive=True),
-    default=BaseImage._default_resampling.value, callback=_resampling_method_cb, show_default=True,
+    default=ResamplingMethod.near.value, callback=_resampling_method_cb, show_default=True,
     help='Resample images with this method before compositing.'
 )
 @click.option(
@@ -740,6 +848,7 @@ def composite(obj, image_id, mask, method, resampling, bbox, region, date):
         geedim search -c s2-sr -s 2021-01-12 -e 2021-01-23 --bbox 23 -33.5 23.1 -33.4 composite -cm q-mosaic download --crs EPSG:3857 --scale 10
     """
     # @formatter:on
+    from geedim.collection import MaskedCollection
 
     # get image ids from command line or chained search command
     if len(obj.image_list) == 0:
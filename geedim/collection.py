@@ -14,20 +14,26 @@
     limitations under the License.
 """
 
+import hashlib
+import json
 import logging
 import re
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Union
+from typing import Dict, List, Union, Iterable, Iterator, Optional
 
 import ee
+import numpy as np
 import tabulate
 import textwrap as wrap
 from geedim import schema, medoid
+from geedim.cache import DiskCache
 from geedim.download import BaseImage
 from geedim.enums import ResamplingMethod, CompositeMethod
 from geedim.errors import UnfilteredError, InputImageError
 from geedim.mask import MaskedImage, class_from_id
+from geedim.scene_index import get_scene_filter
 from geedim.stac import StacCatalog, StacItem
 from geedim.utils import split_id, resample
 from tabulate import TableFormat, Line, DataRow
@@ -72,16 +78,57 @@ def compatible_collections(names: List[str]) -> bool:
 
 
 def parse_date(date: Union[datetime, str], var_name=None) -> datetime:
-    """ Convert a string to a datetime, raising an exception if it is in the wrong format. """
+    """
+    Convert a string or datetime to a naive UTC datetime, raising an exception if it is in the wrong format.  Timezone
+    aware datetimes are converted to UTC, and naive datetimes are assumed to be in UTC.
+    """
     var_name = var_name or 'date'
     if isinstance(date, str):
         try:
             date = datetime.strptime(date, '%Y-%m-%d')
         except ValueError:
             raise ValueError(f'{var_name} should be a datetime instance or a string with format: "%Y-%m-%d"')
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
     return date
 
 
+def split_filter_expression(expression: str) -> List[str]:
+    """
+    Split an EE filter `expression` into the terms of its top level conjunction (``&&``).  Returns a list containing
+    the whole expression if it can't be split e.g. if it contains a top level disjunction.
+    """
+    terms = []
+    depth = 0
+    quote = None
+    start = 0
+    i = 0
+    while i < len(expression):
+        char = expression[i]
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '"\'':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and expression.startswith('||', i):
+            return [expression.strip()]
+        elif depth == 0 and expression.startswith('&&', i):
+            terms.append(expression[start:i].strip())
+            start = i + 2
+            i += 1
+        i += 1
+    terms.append(expression[start:].strip())
+
+    # don't split expressions with an (alternative syntax) top level 'or', or empty terms
+    unquoted_terms = [re.sub(r'"[^"]*"|\'[^\']*\'|\([^()]*\)', '', term) for term in terms]
+    if any([re.search(r'\bor\b', term, flags=re.IGNORECASE) for term in unquoted_terms]) or not all(terms):
+        return [expression.strip()]
+    return terms
+
+
 def abbreviate(name: str) -> str:
     """ Return an acronym for a string in camel or snake case. """
     name = name.strip()
@@ -99,6 +146,18 @@ def abbreviate(name: str) -> str:
 
 
 class MaskedCollection:
+    # placeholder for missing image property values in _get_properties()
+    _null_prop = '__geedim_null__'
+    _default_page_size = 500
+    # approximate number of images per location in an automatically sized search shard
+    _shard_images = 50
+    # image properties set by region statistics in search()
+    _region_stats_props = ['FILL_PORTION', 'CLOUDLESS_PORTION', 'FILL_PORTION_CI', 'CLOUDLESS_PORTION_CI']
+    # optional persistent cache of search results (see enable_search_cache())
+    _search_cache: Optional[DiskCache] = None
+    _past_search_ttl: Optional[float] = None
+    # searches ending more than this many days ago are unlikely to change, and are cached with _past_search_ttl
+    _past_search_days = 30
 
     def __init__(self, ee_collection: ee.ImageCollection, add_props: List[str] = None):
         """
@@ -123,6 +182,50 @@ class MaskedCollection:
         self._image_type = None
         self._stac = None
         self._stats_scale = None
+        # search result shards i.e. date range sub-collections of _ee_collection, retrieved concurrently
+        self._shards = None
+        # whether this is a search result for a past date range (None if it is not a search result, or the search
+        # cache was disabled when it was searched)
+        self._past_search = None
+        # the region statistics sample size, if this is a search result with sampled statistics
+        self._sample_size = None
+        # the query and result collection of the last search that required EE retrieval, for answering contained
+        # searches on the client (see search())
+        self._last_search = None
+        self._property_columns = None
+
+    @staticmethod
+    def enable_search_cache(
+        enable: bool = True, ttl: Optional[float] = 24 * 3600, past_ttl: Optional[float] = 30 * 24 * 3600,
+        max_items: int = 1000
+    ):  # yapf: disable
+        """
+        Enable or disable a persistent, on-disk cache of :meth:`search` results, shared by all collections.
+
+        Cache items are keyed on a fingerprint of the search query i.e. the collection, date range, region, cloud/shadow
+        masking parameters and filters, together with the retrieved properties.  The cache is stored in the geedim
+        cache directory (see :func:`geedim.cache.cache_dir`), and is disabled by default.
+
+        Parameters
+        ----------
+        enable: bool, optional
+            Whether to enable (True) or disable (False) the cache.
+        ttl: float, optional
+            Time to live (s) of cached search results.  If None, cached results do not expire.
+        past_ttl: float, optional
+            Time to live (s) of cached search results whose end date is more than a month in the past.  These
+            rarely change, so can be cached for longer.  If None, cached results do not expire.
+        max_items: int, optional
+            Maximum number of search results to keep in the cache.
+        """
+        MaskedCollection._search_cache = DiskCache('search', ttl=ttl, max_items=max_items) if enable else None
+        MaskedCollection._past_search_ttl = past_ttl
+
+    def _get_search_cache_key(self) -> str:
+        """ Return the search cache key for the encapsulated collection and properties. """
+        # ee_collection.serialize() is client side, and encodes the full search expression
+        key_str = self._ee_collection.serialize() + json.dumps(list(self.schema.keys()))
+        return hashlib.sha256(key_str.encode()).hexdigest()
 
     @classmethod
     def from_name(cls, name: str, add_props: List[str] = None) -> 'MaskedCollection':
@@ -191,15 +294,15 @@ class MaskedCollection:
         if len(image_list) == 0:
             raise ValueError('`image_list` is empty.')
 
+        # wrap ee.Image instances in BaseImage, and fetch the metadata of all image objects in batches (rather than
+        # one at a time when the id and date are retrieved below)
+        image_list = [BaseImage(im_obj) if isinstance(im_obj, ee.Image) else im_obj for im_obj in image_list]
+        BaseImage.prefetch_info([im_obj for im_obj in image_list if isinstance(im_obj, BaseImage)])
+
         im_dict_list = []
         for image_obj in image_list:
             if isinstance(image_obj, str):
                 im_dict_list.append(dict(ee_image=ee.Image(image_obj), id=image_obj, has_date=True))
-            elif isinstance(image_obj, ee.Image):
-                ee_info = image_obj.getInfo()
-                ee_id = ee_info['id'] if 'id' in ee_info else None
-                has_date = ('properties' in ee_info) and ('system:time_start' in ee_info['properties'])
-                im_dict_list.append(dict(ee_image=ee.Image(image_obj), id=ee_id, has_date=has_date))
             elif isinstance(image_obj, BaseImage):
                 im_dict_list.append(
                     dict(ee_image=image_obj.ee_image, id=image_obj.id, has_date=image_obj.date is not None)
@@ -271,10 +374,172 @@ class MaskedCollection:
             raise UnfilteredError(
                 '`properties` can only be retrieved for collections returned by `search()` and `from_list()`'
             )
-        if not self._properties:
-            self._properties = self._get_properties(self._ee_collection)
+        if self._properties is None:
+            self._properties = OrderedDict(item for page in self.iter_properties() for item in page.items())
         return self._properties
 
+    def iter_properties(self, page_size: int = _default_page_size, max_threads: int = 4) -> Iterator[Dict[str, Dict]]:
+        """
+        Iterate over pages of :attr:`properties`, in collection order.  Pages are retrieved from Earth Engine
+        concurrently, and yielded as they become available.  This avoids the time and size limits of retrieving
+        properties for large collections in one request, and allows search results to be displayed as they arrive.
+
+        Parameters
+        ----------
+        page_size: int, optional
+            Maximum number of images per page.
+        max_threads: int, optional
+            Maximum number of pages to retrieve concurrently.
+
+        Yields
+        ------
+        dict
+            A page of :attr:`properties` i.e. a dictionary with image IDs as keys, and dictionaries of image
+            properties as values.
+        """
+        if not self._filtered:
+            raise UnfilteredError(
+                '`properties` can only be retrieved for collections returned by `search()` and `from_list()`'
+            )
+        cache_key = None
+        if (self._properties is None) and self._search_cache and (self._past_search is not None):
+            cache_key = self._get_search_cache_key()
+            if self._past_search:
+                # past search results are cached for longer (a _past_search_ttl of None means they don't expire)
+                ttl = self._past_search_ttl if self._past_search_ttl is not None else float('inf')
+            else:
+                ttl = None  # use the cache ttl
+            cached = self._search_cache.get(cache_key, ttl=ttl)
+            if cached is not None:
+                self._properties = OrderedDict(cached)
+
+        if self._properties is not None:
+            items = list(self._properties.items())
+            for offset in range(0, len(items), page_size):
+                yield OrderedDict(items[offset:offset + page_size])
+            return
+
+        def get_page(offset: int) -> Dict[str, Dict]:
+            page_collection = ee.ImageCollection(self._ee_collection.toList(page_size, offset))
+            return self._get_properties(page_collection)
+
+        def split_pages(shard_props: Dict[str, Dict]) -> List[Dict[str, Dict]]:
+            items = list(shard_props.items())
+            return [OrderedDict(items[offset:offset + page_size]) for offset in range(0, len(items), page_size)]
+
+        properties = OrderedDict()
+        with ThreadPoolExecutor(max_workers=max_threads) as executor:
+            futures = deque()
+            try:
+                if self._shards:
+                    # retrieve each search shard in a single request, and split it into pages
+                    futures.extend(executor.submit(self._get_properties, shard) for shard in self._shards)
+                    while futures:
+                        for page in split_pages(futures.popleft().result()):
+                            properties.update(page)
+                            yield page
+                else:
+                    # Retrieve pages until one comes back short, rather than counting the collection first.  The
+                    # first page is retrieved on its own, so that small collections need a single request.  If it is
+                    # full, following pages are retrieved up to max_threads at a time.
+                    offset = 0
+                    futures.append(executor.submit(get_page, offset))
+                    while futures:
+                        page = futures.popleft().result()
+                        if len(page) > 0:
+                            properties.update(page)
+                            yield page
+                        if len(page) < page_size:
+                            break
+                        while len(futures) < max_threads:
+                            offset += page_size
+                            futures.append(executor.submit(get_page, offset))
+            finally:
+                # cancel outstanding pages if iteration is stopped early, or a short page has been retrieved
+                for future in futures:
+                    future.cancel()
+        self._properties = properties
+        if cache_key:
+            self._search_cache.set(cache_key, list(properties.items()))
+
+    def iter_properties_table(self, pages: Iterable[Dict[str, Dict]], schema: Dict = None) -> Iterator[str]:
+        """
+        Format pages of :attr:`properties` into one printable table, as the pages become available.  Properties
+        (columns) are ordered according to :attr:`schema`, and long form property names are replaced with
+        abbreviations.  The columns and their widths are fixed by the first page.
+
+        Parameters
+        ----------
+        pages: iterable of dict
+            Pages of :attr:`properties` e.g. as yielded by :meth:`iter_properties`.
+        schema: dict, optional
+            Property schema to format with.  Defaults to :attr:`schema`.
+
+        Yields
+        ------
+        str
+            Table rows for each page.  Rows for the first page are preceded by the table header.
+        """
+        if not schema:
+            schema = self.schema
+
+        def format_value(value) -> str:
+            if value is None:
+                return ''
+            return f'{value:.2f}' if isinstance(value, float) else str(value)
+
+        def format_columns(page: Dict[str, Dict], prop_names: List[str]) -> List[List[str]]:
+            columns = []
+            for prop_name in prop_names:
+                if prop_name == 'system:time_start':
+                    # convert timestamps to date strings in one vectorised operation
+                    column = self._get_property_columns(page, [prop_name])[prop_name]
+                    is_missing = np.isnat(column)
+                    column = np.char.replace(np.datetime_as_string(column, unit='m'), 'T', ' ').astype(object)
+                    column[is_missing] = ''
+                    columns.append(column.tolist())
+                else:
+                    columns.append([format_value(im_props.get(prop_name, None)) for im_props in page.values()])
+            return columns
+
+        prop_names = widths = right_align = None
+        for page in pages:
+            if len(page) == 0:
+                continue
+            lines = []
+            if prop_names is None:
+                # find the columns and their widths from the first page, omitting columns with no values
+                prop_names = [
+                    prop_name for prop_name in schema.keys()
+                    if any([im_props.get(prop_name, None) is not None for im_props in page.values()])
+                ]  # yapf: disable
+                headers = [schema[prop_name]['abbrev'] for prop_name in prop_names]
+                columns = format_columns(page, prop_names)
+                widths = [max([len(header)] + [len(value) for value in column]) for header, column in
+                          zip(headers, columns)]
+                # right align numeric columns
+                right_align = [
+                    all([
+                        isinstance(im_props[prop_name], (int, float)) and not isinstance(im_props[prop_name], bool)
+                        for im_props in page.values() if im_props.get(prop_name, None) is not None
+                    ]) and (prop_name != 'system:time_start')
+                    for prop_name in prop_names
+                ]  # yapf: disable
+                lines.append(' '.join(
+                    header.rjust(width) if right else header.ljust(width)
+                    for header, width, right in zip(headers, widths, right_align)
+                ).rstrip())
+                lines.append(' '.join('-' * width for width in widths))
+            else:
+                columns = format_columns(page, prop_names)
+
+            for row in zip(*columns):
+                lines.append(' '.join(
+                    value.rjust(width) if right else value.ljust(width)
+                    for value, width, right in zip(row, widths, right_align)
+                ).rstrip())
+            yield '\n'.join(lines)
+
     @property
     def properties_table(self) -> str:
         """ :attr:`properties` formatted as a printable table string. """
@@ -292,6 +557,16 @@ class MaskedCollection:
             else:
                 self._schema = schema.default_prop_schema.copy()
 
+            if self._sample_size:
+                # include confidence intervals of sampled region statistics, after the statistics they refer to
+                prop_schema = {}
+                for prop_name, prop_dict in self._schema.items():
+                    prop_schema[prop_name] = prop_dict
+                    ci_name = prop_name + '_CI'
+                    if ci_name in schema.sample_prop_schema:
+                        prop_schema[ci_name] = schema.sample_prop_schema[ci_name]
+                self._schema = prop_schema
+
             # append any additional properties to the schema
             if self._add_props:
                 for add_prop in self._add_props:
@@ -325,20 +600,94 @@ class MaskedCollection:
         """ Retrieve properties of images in a given Earth Engine image collection. """
 
         # the properties to retrieve
-        prop_key_list = ee.List(list(self.schema.keys()))
+        prop_keys = list(self.schema.keys())
+
+        # Retrieve properties as columns with aggregate_array(), which EE evaluates in parallel (unlike iterate(),
+        # which is evaluated sequentially).  aggregate_array() skips missing values, so these are replaced with a
+        # placeholder to keep columns aligned.
+        null_dict = ee.Dictionary.fromLists(prop_keys, ee.List.repeat(self._null_prop, len(prop_keys)))
+
+        def to_feature(ee_image: ee.Image) -> ee.Feature:
+            return ee.Feature(None, null_dict.combine(ee_image.toDictionary(prop_keys), True))
 
-        def aggregrate_props(ee_image, coll_list):
-            im_dict = ee_image.toDictionary(prop_key_list)
-            return ee.List(coll_list).add(im_dict)
+        prop_coll = ee_collection.map(to_feature)
+        prop_cols = ee.Dictionary.fromLists(prop_keys, [prop_coll.aggregate_array(key) for key in prop_keys])
+        prop_cols = prop_cols.getInfo()
 
-        # retrieve list of dicts of properties of images in ee_collection
-        props_list = ee.List(ee_collection.iterate(aggregrate_props, ee.List([]))).getInfo()
         # add image properties to the return dict in the same order as the underlying collection
         props_dict = OrderedDict()
-        for prop_dict in props_list:
+        for prop_values in zip(*[prop_cols[key] for key in prop_keys]):
+            prop_dict = {key: value for key, value in zip(prop_keys, prop_values) if value != self._null_prop}
             props_dict[prop_dict['system:id']] = prop_dict
         return props_dict
 
+    @staticmethod
+    def _get_property_columns(properties: Dict[str, Dict], keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Convert `properties` into a dictionary of typed numpy columns for the property `keys`.
+        ``system:time_start`` is converted to ``datetime64[ms]``, numeric properties to ``int64`` (if they are all
+        present integers) or ``float64``, and other properties to ``object``.  Missing values are NaT, NaN or None.
+        """
+        columns = OrderedDict()
+        for key in keys:
+            values = [im_props.get(key, None) for im_props in properties.values()]
+            is_missing = [value is None for value in values]
+            is_numeric = all([
+                isinstance(value, (int, float)) and not isinstance(value, bool) for value in values if value is not None
+            ])
+            if key == 'system:time_start':
+                nat = np.iinfo('int64').min  # the int64 representation of NaT
+                column = np.array([nat if value is None else value for value in values], dtype='int64')
+                column = column.view('datetime64[ms]')
+            elif is_numeric and not any(is_missing) and all([isinstance(value, int) for value in values]):
+                column = np.array(values, dtype='int64')
+            elif is_numeric and not all(is_missing):
+                column = np.array(values, dtype='float64')
+            else:
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+            columns[key] = column
+        return columns
+
+    @property
+    def property_columns(self) -> Dict[str, np.ndarray]:
+        """
+        :attr:`properties` as a dictionary of typed numpy columns, keyed by property name and ordered by
+        :attr:`schema`.  ``system:time_start`` is a ``datetime64[ms]`` column, and missing values are NaT, NaN or
+        None.
+        """
+        if self._property_columns is None:
+            self._property_columns = self._get_property_columns(self.properties, list(self.schema.keys()))
+        return self._property_columns
+
+    def to_pandas(self):
+        """
+        Return :attr:`properties` as a ``pandas.DataFrame`` indexed by image ID.  Requires `pandas
+        <https://pandas.pydata.org>`_.  Numeric and date columns are not copied.
+        """
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError('`to_pandas()` requires pandas to be installed.')
+        columns = self.property_columns.copy()
+        index = pd.Index(columns.pop('system:id'), name='system:id')
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def to_arrow(self):
+        """
+        Return :attr:`properties` as a ``pyarrow.Table``.  Requires `pyarrow <https://arrow.apache.org>`_.  Numeric
+        and date columns without missing values are not copied.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError('`to_arrow()` requires pyarrow to be installed.')
+        arrays = [
+            pa.array(column, from_pandas=True) if column.dtype == object else pa.array(column)
+            for column in self.property_columns.values()
+        ]
+        return pa.table(arrays, names=list(self.property_columns.keys()))
+
     def _get_properties_table(self, properties: Dict, schema: Dict = None) -> str:
         """
         Format the given properties into a table.  Orders properties (columns) according :attr:`schema` and
@@ -347,18 +696,24 @@ class MaskedCollection:
         if not schema:
             schema = self.schema
 
-        abbrev_props = []
-        for im_id, im_prop_dict in properties.items():
-            abbrev_dict = OrderedDict()
-            for prop_name, key_dict in schema.items():
-                if prop_name in im_prop_dict:
-                    if prop_name == 'system:time_start':  # convert timestamp to date string
-                        dt = datetime.utcfromtimestamp(im_prop_dict[prop_name] / 1000)
-                        abbrev_dict[key_dict['abbrev']] = datetime.strftime(dt, '%Y-%m-%d %H:%M')
-                    else:
-                        abbrev_dict[key_dict['abbrev']] = im_prop_dict[prop_name]
-            abbrev_props.append(abbrev_dict)
-        return tabulate.tabulate(abbrev_props, headers='keys', floatfmt='.2f', tablefmt=_table_fmt)
+        # build the table column by column, omitting columns with no values
+        headers = []
+        columns = []
+        for prop_name, key_dict in schema.items():
+            if prop_name == 'system:time_start':
+                # convert timestamps to date strings in one vectorised operation
+                column = self._get_property_columns(properties, [prop_name])[prop_name]
+                is_missing = np.isnat(column)
+                column = np.char.replace(np.datetime_as_string(column, unit='m'), 'T', ' ').astype(object)
+                column[is_missing] = None
+            else:
+                column = [im_props.get(prop_name, None) for im_props in properties.values()]
+            if any([value is not None for value in column]):
+                headers.append(key_dict['abbrev'])
+                columns.append(column)
+
+        rows = list(zip(*columns))
+        return tabulate.tabulate(rows, headers=headers, floatfmt='.2f', tablefmt=_table_fmt)
 
     def _prepare_for_composite(
         self, method: CompositeMethod, mask: bool = True, resampling: Union[ResamplingMethod, str] = None,
@@ -417,11 +772,17 @@ class MaskedCollection:
 
     def search(
         self, start_date: Union[datetime, str] = None, end_date: Union[datetime, str] = None, region: Dict = None,
-        fill_portion: float = None, cloudless_portion: float = None, custom_filter: str = None, **kwargs
+        fill_portion: float = None, cloudless_portion: float = None, custom_filter: str = None,
+        shard_days: Union[int, str] = None, max_cloud_cover: float = None, sample_size: int = None, **kwargs
     ) -> 'MaskedCollection':
         """
         Search for images based on date, region, filled/cloudless portion, and custom criteria.
 
+        This collection keeps a reference to the query and result collection of its last search that needed Earth
+        Engine retrieval.  Once the result :attr:`properties` have been retrieved, later searches with the same region,
+        masking parameters and custom filter, and a contained date range or higher portion thresholds, are answered
+        by filtering those properties on the client.  Use a new collection (e.g. with :meth:`from_name`) to avoid this.
+
         Parameters
         ----------
         start_date : datetime, str
@@ -430,7 +791,9 @@ class MaskedCollection:
             End date (UTC).  In '%Y-%m-%d' format if a string.  If None, ``end_date`` is set to a day after
             ``start_date``.
         region : dict, ee.Geometry
-            Polygon in WGS84 specifying a region that images should intersect.
+            Polygon in WGS84 specifying a region that images should intersect.  For Sentinel-2 collections, images
+            are first limited to the MGRS tiles intersecting the region, found from the MGRS grid definition (see
+            ``geedim.scene_index``).
         fill_portion: float, optional
             Minimum portion (%) of filled (valid) image pixels.
         cloudless_portion: float, optional
@@ -438,6 +801,25 @@ class MaskedCollection:
         custom_filter: str, optional
             Custom image property filter expression e.g. "property > value".  See the `EE docs
             <https://developers.google.com/earth-engine/apidocs/ee-filter-expression>`_.
+        shard_days: int, str, optional
+            Split the ``start_date`` - ``end_date`` range into shards of this many days.  Shards are searched and
+            retrieved concurrently when :attr:`properties` are retrieved, which avoids the time limits of searching
+            long date ranges in a single Earth Engine computation.  If 'auto', the shard size is chosen from the
+            collection revisit interval (supported for the :attr:`~geedim.schema.collection_schema` collections
+            only).  If None (the default), the search is not sharded.
+        max_cloud_cover: float, optional
+            Maximum scene-level cloud cover (%) from the image metadata e.g. ``CLOUD_COVER`` for Landsat.  Images
+            above this are excluded before the (more expensive) region statistics are found.  As scene cloud cover
+            refers to the whole image, this should be set conservatively, i.e. higher than ``100 -
+            cloudless_portion``.  Supported for cloud/shadow maskable collections only.  If None (the default),
+            images are not filtered on scene cloud cover.
+        sample_size: int, optional
+            Estimate filled and cloudless portions from a fixed random sample of this many points inside ``region``,
+            rather than from all region pixels.  This is faster for large regions, as the cost depends on the sample
+            size and not the region area.  95% confidence interval half-widths (%) of the estimates are included in
+            :attr:`properties` as ``FILL_PORTION_CI`` and ``CLOUDLESS_PORTION_CI``.  Portion filters are applied to
+            the estimates.  If None (the default), portions are found from all region pixels, at a coarser scale than
+            :attr:`stats_scale` if the region has more than 1e6 pixels at that scale.
         **kwargs
             Optional cloud/shadow masking parameters - see :meth:`geedim.mask.MaskedImage.__init__` for details.
 
@@ -452,14 +834,12 @@ class MaskedCollection:
         if not start_date or not region:
             logger.warning('Specifying `start_date` and `region` will improve the search speed.')
 
-        def set_region_stats(ee_image: ee.Image):
-            """ Find filled and cloud/shadow free portions inside the search region for a given image.  """
-            gd_image = self.image_type(ee_image, **kwargs)
-            gd_image._set_region_stats(region, scale=self.stats_scale)
-            return gd_image.ee_image
+        if sample_size is not None and (
+            not isinstance(sample_size, int) or isinstance(sample_size, bool) or sample_size < 1
+        ):  # yapf: disable
+            raise ValueError('`sample_size` should be a positive integer.')
 
-        # filter the image collection, finding cloud/shadow masks and region stats
-        ee_collection = self._ee_collection
+        # normalise dates to naive UTC datetimes for comparison with each other, the current time, and past searches
         if start_date:
             start_date = parse_date(start_date, 'start_date')
             if end_date is None:
@@ -469,32 +849,217 @@ class MaskedCollection:
                 end_date = parse_date(end_date, 'end_date')
             if end_date <= start_date:
                 raise ValueError('`end_date` must be at least a day later than `start_date`')
-            ee_collection = ee_collection.filterDate(start_date, end_date)
+        else:
+            # end_date is not used without start_date
+            end_date = None
+
+        def set_region_stats(ee_image: ee.Image):
+            """ Find filled and cloud/shadow free portions inside the search region for a given image.  """
+            gd_image = self.image_type(ee_image, **kwargs)
+            gd_image._set_region_stats(region, scale=self.stats_scale, sample_size=sample_size)
+            return gd_image.ee_image
+
+        def set_fill_stats(ee_image: ee.Image):
+            """ Find the filled portion inside the search region for a given image.  """
+            gd_image = self.image_type(ee_image, **kwargs)
+            gd_image._set_region_stats(region, scale=self.stats_scale, cloudless=False, sample_size=sample_size)
+            # return the source image with FILL_PORTION set, so that the masks are re-created for the images that
+            # pass the fill filter only
+            fill_props = ['FILL_PORTION', 'FILL_PORTION_CI'] if sample_size else ['FILL_PORTION']
+            return ee.Image(ee_image.copyProperties(gd_image.ee_image, fill_props))
+
+        def set_cloudless_stats(ee_image: ee.Image):
+            """ Find the cloud/shadow free portion inside the search region for a given image.  """
+            gd_image = self.image_type(ee_image, **kwargs)
+            gd_image._set_region_stats(region, scale=self.stats_scale, fill=False, sample_size=sample_size)
+            return gd_image.ee_image
+
+        def filter_collection(ee_collection: ee.ImageCollection) -> ee.ImageCollection:
+            """ Filter a date filtered image collection on region and region stats, and sort by date. """
+            if scene_filter:
+                # limit images to the scenes that intersect the region with a (fast) property filter, leaving
+                # filterBounds() as the exact intersection test on the remaining images
+                ee_collection = ee_collection.filter(scene_filter)
+
+            if region:
+                ee_collection = ee_collection.filterBounds(region)
+
+            if scene_cloud_prop:
+                # exclude cloudy scenes from their metadata before finding region stats
+                ee_collection = ee_collection.filter(ee.Filter.lte(scene_cloud_prop, max_cloud_cover))
+
+            if pre_stats_filter:
+                # apply custom filter terms that don't depend on region stats, before finding region stats
+                ee_collection = ee_collection.filter(ee.Filter.expression(pre_stats_filter))
+
+            # set regions stats before filtering on those properties
+            if fill_portion and self.image_type != MaskedImage:
+                # find the (cheap) fill portion and filter on it, before finding the (expensive) cloudless portion,
+                # so that the cloud/shadow mask is only found for images that pass the fill filter
+                ee_collection = ee_collection.map(set_fill_stats)
+                ee_collection = ee_collection.filter(ee.Filter.gte('FILL_PORTION', fill_portion))
+                ee_collection = ee_collection.map(set_cloudless_stats)
+            else:
+                ee_collection = ee_collection.map(set_region_stats)
+                if fill_portion:
+                    ee_collection = ee_collection.filter(ee.Filter.gte('FILL_PORTION', fill_portion))
 
-        if region:
-            ee_collection = ee_collection.filterBounds(region)
+            if cloudless_portion and self.image_type != MaskedImage:
+                ee_collection = ee_collection.filter(ee.Filter.gte('CLOUDLESS_PORTION', cloudless_portion))
 
-        # set regions stats before filtering on those properties
-        ee_collection = ee_collection.map(set_region_stats)
-        if fill_portion:
-            ee_collection = ee_collection.filter(ee.Filter.gte('FILL_PORTION', fill_portion))
+            if post_stats_filter:
+                # this expression can include properties from set_region_stats
+                ee_collection = ee_collection.filter(ee.Filter.expression(post_stats_filter))
 
-        if cloudless_portion and self.image_type != MaskedImage:
-            ee_collection = ee_collection.filter(ee.Filter.gte('CLOUDLESS_PORTION', cloudless_portion))
+            return ee_collection.sort('system:time_start')
 
+        # split the custom filter into terms that can be applied before, and terms that must be applied after,
+        # finding region stats
+        pre_stats_filter = post_stats_filter = None
         if custom_filter:
-            # this expression can include properties from set_region_stats
-            ee_collection = ee_collection.filter(ee.Filter.expression(custom_filter))
+            stats_pattern = r'\b(' + '|'.join(self._region_stats_props) + r')\b'
+            pre_terms, post_terms = [], []
+            for term in split_filter_expression(custom_filter):
+                unquoted_term = re.sub(r'"[^"]*"|\'[^\']*\'', '', term)
+                (post_terms if re.search(stats_pattern, unquoted_term) else pre_terms).append(f'({term})')
+            pre_stats_filter = ' && '.join(pre_terms) if pre_terms else None
+            post_stats_filter = ' && '.join(post_terms) if post_terms else None
+
+        scene_filter = None
+        scene_index = schema.collection_schema.get(self.name, {}).get('scene_index', None)
+        if region and scene_index:
+            scene_filter = get_scene_filter(scene_index, region)
+
+        scene_cloud_prop = None
+        if max_cloud_cover is not None:
+            scene_cloud_prop = schema.collection_schema.get(self.name, {}).get('scene_cloud_prop', None)
+            if not scene_cloud_prop:
+                logger.warning(f'`max_cloud_cover` is not supported for {self.name}, and will be ignored.')
 
-        ee_collection = ee_collection.sort('system:time_start')
+        # filter the image collection, finding cloud/shadow masks and region stats
+        shards = None
+        if start_date:
+            shard_dates = self._get_shard_dates(start_date, end_date, shard_days) if shard_days is not None else None
+            if shard_dates and len(shard_dates) > 2:
+                shards = [
+                    filter_collection(self._ee_collection.filterDate(shard_start, shard_end))
+                    for shard_start, shard_end in zip(shard_dates[:-1], shard_dates[1:])
+                ]
+                # combine the shards into a single collection for compositing etc.
+                ee_collection = shards[0]
+                for shard in shards[1:]:
+                    ee_collection = ee_collection.merge(shard)
+                ee_collection = ee_collection.sort('system:time_start')
+            else:
+                ee_collection = filter_collection(self._ee_collection.filterDate(start_date, end_date))
+        else:
+            if shard_days is not None:
+                logger.warning('`shard_days` is ignored when `start_date` is not specified.')
+            ee_collection = filter_collection(self._ee_collection)
 
         # return a new MaskedCollection containing the filtered EE collection (the EE collection
         # wrapped by MaskedCollection remains fixed)
         gd_collection = MaskedCollection(ee_collection, add_props=self._add_props)
         gd_collection._name = self._name
         gd_collection._filtered = True
+        gd_collection._shards = shards
+        gd_collection._sample_size = sample_size
+        if self._search_cache:
+            # past search results are unlikely to change, and are cached for longer (see iter_properties())
+            gd_collection._past_search = bool(
+                end_date and (datetime.utcnow() - end_date > timedelta(days=self._past_search_days))
+            )
+
+        # answer the search from the last search result if possible, otherwise record it for future searches
+        query = dict(
+            start_date=start_date, end_date=end_date, region=self._get_region_key(region),
+            fill_portion=fill_portion or 0,
+            cloudless_portion=(cloudless_portion or 0) if self.image_type != MaskedImage else 0,
+            custom_filter=custom_filter, max_cloud_cover=max_cloud_cover if scene_cloud_prop else None,
+            sample_size=sample_size, kwargs=json.dumps(kwargs, sort_keys=True, default=str)
+        )
+        properties = self._get_subsumed_properties(query)
+        if properties is not None:
+            logger.debug('Search results are a subset of the last search results, and are filtered on the client.')
+            gd_collection._properties = properties
+        else:
+            self._last_search = dict(query=query, collection=gd_collection)
         return gd_collection
 
+    @staticmethod
+    def _get_region_key(region: Union[Dict, ee.Geometry, None]) -> Optional[str]:
+        """ Return a string that uniquely identifies a search `region`. """
+        if region is None:
+            return None
+        if isinstance(region, ee.ComputedObject):
+            return region.serialize()
+        return json.dumps(region, sort_keys=True)
+
+    def _get_subsumed_properties(self, query: Dict) -> Optional[Dict[str, Dict]]:
+        """
+        Return search result properties for the search `query` by filtering the retrieved properties of the last
+        search, if the last search has the same region, masking parameters and custom filter, and a date range and
+        portion thresholds that contain those of `query`.  Otherwise, return None.  Query dates should be naive UTC
+        datetimes, as normalised by :meth:`search`.
+        """
+        last_search = self._last_search
+        if not last_search or (last_search['collection']._properties is None):
+            return None
+        last_query = last_search['query']
+        match_keys = ['region', 'custom_filter', 'max_cloud_cover', 'sample_size', 'kwargs']
+        if any([query[key] != last_query[key] for key in match_keys]):
+            return None
+        if last_query['start_date'] and not (
+            query['start_date'] and (query['start_date'] >= last_query['start_date']) and
+            (query['end_date'] <= last_query['end_date'])
+        ):  # yapf: disable
+            return None
+        filter_keys = {'FILL_PORTION': 'fill_portion', 'CLOUDLESS_PORTION': 'cloudless_portion'}
+        for prop_key, query_key in filter_keys.items():
+            if (query[query_key] < last_query[query_key]) or (
+                (query[query_key] > last_query[query_key]) and (prop_key not in self.schema)
+            ):  # yapf: disable
+                return None
+
+        # find the properties of the images that pass the query filters with vectorised operations on property
+        # columns
+        properties = last_search['collection'].properties
+        columns = last_search['collection'].property_columns
+        mask = np.ones(len(properties), dtype=bool)
+        if query['start_date']:
+            # query dates are naive UTC (see search())
+            start_time, end_time = [
+                date.replace(tzinfo=timezone.utc).timestamp() * 1000
+                for date in [query['start_date'], query['end_date']]
+            ]
+            start_time, end_time = np.datetime64(int(start_time), 'ms'), np.datetime64(int(end_time), 'ms')
+            mask &= (columns['system:time_start'] >= start_time) & (columns['system:time_start'] < end_time)
+        for prop_key, query_key in filter_keys.items():
+            if query[query_key] > last_query[query_key]:
+                mask &= columns[prop_key].astype(float) >= query[query_key]
+
+        image_ids = columns['system:id'][mask]
+        return OrderedDict([(image_id, properties[image_id]) for image_id in image_ids])
+
+    def _get_shard_dates(self, start_date: datetime, end_date: datetime, shard_days: Union[int, str]) -> List[datetime]:
+        """
+        Return a list of shard boundary dates that split the `start_date` - `end_date` range into shards of
+        `shard_days` days.  See :meth:`search` for `shard_days` details.
+        """
+        if shard_days == 'auto':
+            if self.name not in schema.collection_schema:
+                logger.warning(f'Automatic `shard_days` is not supported for {self.name}, the search is not sharded.')
+                return [start_date, end_date]
+            shard_days = schema.collection_schema[self.name]['revisit'] * self._shard_images
+        elif not isinstance(shard_days, int) or isinstance(shard_days, bool) or shard_days < 1:
+            raise ValueError("`shard_days` should be a positive integer, or 'auto'.")
+
+        shard_dates = [start_date]
+        while shard_dates[-1] + timedelta(days=shard_days) < end_date:
+            shard_dates.append(shard_dates[-1] + timedelta(days=shard_days))
+        shard_dates.append(end_date)
+        return shard_dates
+
     def composite(
         self, method: Union[CompositeMethod, str] = None, mask: bool = True,
         resampling: Union[ResamplingMethod, str] = None, date: Union[datetime, str] = None, region: dict = None,
@@ -590,4 +1155,5 @@ class MaskedCollection:
         comp_image = comp_image.set('system:time_start', timestamp)
         gd_comp_image = self.image_type(comp_image)
         gd_comp_image._id = comp_id  # avoid getInfo() for id property
+        gd_comp_image._comp_method = method.value
         return gd_comp_image
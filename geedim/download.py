@@ -15,42 +15,40 @@
 """
 
 ##
+import hashlib
+import json
 import logging
 import os
 import pathlib
+import re
 import threading
 import time
 import warnings
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from itertools import product
+from itertools import islice
 from typing import Tuple, Dict, List, Union, Iterator, Optional
 
 import ee
 import numpy as np
 import rasterio as rio
+from rasterio import features
 from rasterio.crs import CRS
 from rasterio.enums import Resampling as RioResampling
+from rasterio.warp import transform_geom
 from rasterio.windows import Window
 from tqdm import TqdmWarning
 from tqdm.auto import tqdm
 from tqdm.contrib.logging import logging_redirect_tqdm
 
 from geedim import utils
-from geedim.enums import ResamplingMethod
+from geedim.cache import DiskCache
+from geedim.enums import ResamplingMethod, supported_dtypes
 from geedim.stac import StacCatalog, StacItem
 from geedim.tile import Tile
 
 logger = logging.getLogger(__name__)
 
-supported_dtypes = ['uint8', 'uint16', 'uint32', 'int8', 'int16', 'int32', 'float32', 'float64']
-""" Supported image data types for downloading/exporting. """
-# Note:
-# - while gdal >= 3.5 supports *int64 data type, there is a rasterio bug retrieving the *int64 nodata value,
-# so geedim will not support these types for now.
-# - the ordering of the list above is relevant to the auto dtype and should be: unsigned ints smallest - largest,
-# signed ints smallest to largest, float types smallest to largest.
-
 
 class BaseImage:
     _float_nodata = float('nan')
@@ -58,6 +56,19 @@ class BaseImage:
     _default_resampling = ResamplingMethod.near
     _ee_max_tile_size = 32
     _ee_max_tile_dim = 10000
+    _ee_asset_tile_dim = 256  # assumed dimension of the internal tiles EE stores assets in (see download(align_tiles))
+    # maximum fractional increase in the number of download tiles allowed, to align download tiles with asset tiles
+    _max_aligned_tile_increase = 0.25
+    # rough ratio of compressed (zipped GeoTIFF) to raw download size, for estimating download transfer size
+    _compress_ratio = 0.5
+    # optional persistent store of learned tile size limits, keyed by expression class (see
+    # enable_tile_limit_cache())
+    _tile_limits: Optional[DiskCache] = None
+    # optional persistent cache of image metadata (see enable_info_cache())
+    _info_cache: Optional[DiskCache] = None
+    _tile_limits_lock = threading.Lock()
+    # pattern of EE errors that indicate a tile was too big to compute or download
+    _tile_limit_error_pattern = re.compile(r'memory limit|request size|too large', flags=re.IGNORECASE)
 
     def __init__(self, ee_image: ee.Image):
         """
@@ -98,11 +109,124 @@ class BaseImage:
         gd_image._id = image_id  # set the id attribute from image_id (avoids a call to getInfo() for .id property)
         return gd_image
 
+    @staticmethod
+    def enable_info_cache(enable: bool = True, ttl: Optional[float] = 7 * 24 * 3600, max_items: int = 10000):
+        """
+        Enable or disable a persistent, on-disk cache of Earth Engine image metadata, shared by all images.
+
+        Catalog images are effectively immutable, so caching their metadata avoids a ``getInfo()`` round trip for
+        each image in repeated runs.  Cache items are keyed on the image ID and a fingerprint of the image expression.
+        The cache is stored in the geedim cache directory (see :func:`geedim.cache.cache_dir`), and is disabled by
+        default.
+
+        Parameters
+        ----------
+        enable: bool, optional
+            Whether to enable (True) or disable (False) the cache.
+        ttl: float, optional
+            Time to live (s) of cached metadata.  If None, cached metadata does not expire.
+        max_items: int, optional
+            Maximum number of images to keep in the cache.
+        """
+        BaseImage._info_cache = DiskCache('ee_info', ttl=ttl, max_items=max_items) if enable else None
+
+    @staticmethod
+    def enable_tile_limit_cache(enable: bool = True, max_items: int = 1000):
+        """
+        Enable or disable a persistent, on-disk store of learned download tile size limits, shared by all images.
+
+        Earth Engine tile size limits depend on the image expression.  When enabled, tile sizes that succeed, or fail
+        with memory / size errors, are recorded for each class of image expression (source collection, composite
+        method, masking and data type), and downloads of that class start from the learned safe tile size.  The
+        store is kept in the geedim cache directory (see :func:`geedim.cache.cache_dir`), and is disabled by
+        default.
+
+        Parameters
+        ----------
+        enable: bool, optional
+            Whether to enable (True) or disable (False) the store.
+        max_items: int, optional
+            Maximum number of expression classes to keep in the store.
+        """
+        BaseImage._tile_limits = DiskCache('tile_limits', max_items=max_items) if enable else None
+
+    def _get_info_cache_key(self) -> str:
+        """ Return the metadata cache key for the encapsulated image. """
+        # ee_image.serialize() is client side, and encodes the full image expression
+        expression_hash = hashlib.sha256(self._ee_image.serialize().encode()).hexdigest()
+        return f'{self._id or ""}:{expression_hash}'
+
+    @staticmethod
+    def prefetch_info(images: List['BaseImage'], chunk_size: int = 100, max_threads: int = 8):
+        """
+        Fetch the Earth Engine metadata of several images in batches, and cache it in each image.
+
+        Images are fetched in chunks of `chunk_size` images per Earth Engine request, with chunks fetched
+        concurrently.  This is much faster than fetching the metadata of each image in turn, which happens when e.g. an
+        image property like :attr:`crs` is first accessed.  Images with cached metadata are not re-fetched.  If a
+        chunk fails, its images are fetched one at a time, and metadata of images that fail individually is left
+        unfetched.
+
+        Parameters
+        ----------
+        images: list of BaseImage
+            Images to fetch metadata for.
+        chunk_size: int, optional
+            Maximum number of images to fetch in one Earth Engine request.
+        max_threads: int, optional
+            Maximum number of concurrent Earth Engine requests.
+        """
+        images = [im for im in images if im.__ee_info is None]
+        cache_keys = {}
+        if BaseImage._info_cache:
+            # use any cached metadata
+            cache_keys = {id(im): im._get_info_cache_key() for im in images}
+            for im in images:
+                im.__ee_info = BaseImage._info_cache.get(cache_keys[id(im)])
+            images = [im for im in images if im.__ee_info is None]
+        if len(images) == 0:
+            return
+        chunks = [images[i:i + chunk_size] for i in range(0, len(images), chunk_size)]
+
+        def fetch_chunk(chunk: List['BaseImage']):
+            """ Fetch and cache metadata for a chunk of images. """
+            try:
+                ee_infos = ee.List([im.ee_image for im in chunk]).getInfo()
+            except ee.EEException as ex:
+                # one bad image fails the whole chunk, so fall back to fetching the chunk's images one at a time
+                logger.debug(f'Could not prefetch image metadata chunk, fetching images individually: {str(ex)}')
+                for im in chunk:
+                    try:
+                        im._ee_info
+                    except ee.EEException as im_ex:
+                        # leave the metadata unfetched, so the error is raised when the image's metadata is used
+                        logger.debug(f'Could not prefetch image metadata: {str(im_ex)}')
+                return
+
+            for im, ee_info in zip(chunk, ee_infos):
+                im.__ee_info = ee_info
+                if BaseImage._info_cache:
+                    BaseImage._info_cache.set(cache_keys[id(im)], ee_info)
+
+        if len(chunks) == 1:
+            fetch_chunk(chunks[0])
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_threads, len(chunks))) as executor:
+                # list() raises any chunk exceptions
+                list(executor.map(fetch_chunk, chunks))
+
     @property
     def _ee_info(self) -> Dict:
         """ Earth Engine image metadata. """
         if self.__ee_info is None:
-            self.__ee_info = self._ee_image.getInfo()
+            if self._info_cache:
+                cache_key = self._get_info_cache_key()
+                self.__ee_info = self._info_cache.get(cache_key)
+                if self.__ee_info is None:
+                    self.__ee_info = self._ee_image.getInfo()
+                    self._info_cache.set(cache_key, self.__ee_info)
+            else:
+                self.__ee_info = self._ee_image.getInfo()
         return self.__ee_info
 
     @property
@@ -412,6 +536,8 @@ class BaseImage:
             # is in degrees.
             raise ValueError(f'This image is in EPSG:4326, you need to specify a scale in meters.')
 
+        # export on the source pixel grid if possible, otherwise let EE find a grid for region, crs and scale
+        grid_export_args = self._get_grid_export_args(region=region, crs=crs, scale=scale)
         region = region or self.footprint
         crs = crs or ee.Projection(self.crs, tuple(self.transform)[:6])
         scale = scale or self.scale
@@ -439,12 +565,53 @@ class BaseImage:
             ee_image = utils.resample(ee_image, resampling)
 
         ee_image = self._convert_dtype(ee_image, dtype=dtype or im_dtype)
-        # TODO: Specify `crs_transform` and `dimensions` (as in tile), so that everything stays on the source grid
-        #  where possible i.e. where the export CRS and scale are the same as the source.
-        export_args = dict(region=region, crs=crs, scale=scale, fileFormat='GeoTIFF', filePerBand=False)
+        export_args = grid_export_args or dict(region=region, crs=crs, scale=scale)
+        export_args.update(fileFormat='GeoTIFF', filePerBand=False)
         ee_image, _ = ee_image.prepare_for_export(export_args)
         return BaseImage(ee_image)
 
+    def _get_grid_export_args(self, region: Dict = None, crs: str = None, scale: float = None) -> Optional[Dict]:
+        """
+        Return ``crs``, ``crs_transform`` and ``dimensions`` export arguments that keep exported pixels on the
+        encapsulated image's (minimum scale band) pixel grid, with bounds snapped outwards to whole pixels to contain
+        `region`.  Returns None if the export can't be on the source grid i.e. if `crs` or `scale` differ from the
+        source, the source has no fixed projection or is rotated, or `region` is not a geojson dict.
+        """
+        region = region or self.footprint
+        if not self.has_fixed_projection or not self.transform or not isinstance(region, dict):
+            return None
+        src_transform = self.transform
+        if (src_transform.b != 0) or (src_transform.d != 0):
+            return None
+        if scale and not np.isclose(scale, self.scale):
+            return None
+        if crs:
+            try:
+                if CRS.from_string(crs) != CRS.from_string(self.crs):
+                    return None
+            except rio.errors.CRSError:
+                return None
+
+        # find the region bounds in pixel coordinates of the source grid, and snap them outwards to whole pixels
+        if region['type'] == 'LinearRing':
+            region = dict(type='Polygon', coordinates=[region['coordinates']])
+        try:
+            src_region = transform_geom('EPSG:4326', CRS.from_string(self.crs), region)
+        except Exception as ex:
+            logger.debug(f'Could not transform region to source CRS: {str(ex)}')
+            return None
+        left, bottom, right, top = features.bounds(src_region)
+        cols, rows = ~src_transform * (np.array([left, right]), np.array([top, bottom]))
+        # allow for floating point error when the region is already on whole pixels
+        eps = 1e-6
+        col_off, row_off = int(np.floor(np.min(cols) + eps)), int(np.floor(np.min(rows) + eps))
+        col_end, row_end = int(np.ceil(np.max(cols) - eps)), int(np.ceil(np.max(rows) - eps))
+        crs_transform = src_transform * rio.Affine.translation(col_off, row_off)
+        return dict(
+            crs=self.crs, crs_transform=tuple(crs_transform)[:6],
+            dimensions=(max(col_end - col_off, 1), max(row_end - row_off, 1))
+        )
+
     def _prepare_for_download(self, set_nodata: bool = True, **kwargs) -> Tuple['BaseImage', Dict]:
         """
         Prepare the encapsulated image for tiled GeoTIFF download. Will reproject, resample, clip and convert the image
@@ -477,12 +644,76 @@ class BaseImage:
         return exp_image, profile
 
     @staticmethod
-    def _get_tile_shape(
-        exp_image: 'BaseImage', max_tile_size: Optional[float] = None, max_tile_dim: Optional[int] = None
-    ) -> Tuple[Tuple[int, int], int]:  # yapf: disable
+    def _get_tile_dtype_size(dtype: str) -> int:
+        """ Return the size (bytes) of `dtype` as counted by EE towards its download size limit. """
+        dtype_size = np.dtype(dtype).itemsize
+        if dtype.endswith('int8'):
+            # workaround for GEE overestimate of *int8 dtype download sizes
+            dtype_size *= 2
+        return dtype_size
+
+    @property
+    def _expression_class(self) -> Dict:
         """
-        Return a tile shape and number of tiles for a given BaseImage, such that the tile shape satisfies GEE
-        download limits, and is 'square-ish'.
+        A coarse fingerprint of the encapsulated image expression, for keying learned tile size limits.  Sub-classes
+        can extend this with e.g. compositing and masking details.
+        """
+        image_id = self.id
+        if image_id:
+            source = utils.split_id(image_id)[0]
+        else:
+            # images without an ID have no collection to share limits with, so are identified by their expression
+            source = hashlib.sha256(self._ee_image.serialize().encode()).hexdigest()
+        return dict(source=source, composite=None, mask=False)
+
+    def _get_tile_limits_key(self, exp_image: 'BaseImage') -> str:
+        """ Return the learned tile limits key for `exp_image`, prepared from the encapsulated image. """
+        return json.dumps(dict(self._expression_class, dtype=exp_image.dtype), sort_keys=True)
+
+    def _get_learned_tile_size(self, exp_image: 'BaseImage') -> Optional[float]:
+        """
+        Return the learned maximum tile size (MB) for `exp_image`, prepared from the encapsulated image.  Returns
+        None if there have been no tile size failures for its expression class, or the store is not enabled (see
+        :meth:`enable_tile_limit_cache`).
+        """
+        if not self._tile_limits:
+            return None
+        limits = self._tile_limits.get(self._get_tile_limits_key(exp_image))
+        if not limits or not limits.get('min_fail'):
+            return None
+        # use the largest successful size below the smallest failed size if there is one, otherwise halve the smallest
+        # failed size
+        safe_size = max(limits.get('max_ok') or 0, limits['min_fail'] // 2)
+        return (safe_size + 1) / (1 << 20)
+
+    def _record_tile_size(self, exp_image: 'BaseImage', tile_size: int, success: bool):
+        """
+        Record a successful or failed (i.e. too big) tile size (bytes as counted by EE) for `exp_image`, prepared from
+        the encapsulated image.  Does nothing if the store is not enabled (see :meth:`enable_tile_limit_cache`).
+        """
+        if not self._tile_limits:
+            return
+        key = self._get_tile_limits_key(exp_image)
+        with self._tile_limits_lock:
+            limits = self._tile_limits.get(key) or dict(max_ok=None, min_fail=None)
+            if success:
+                limits['max_ok'] = max(limits['max_ok'] or 0, tile_size)
+                if limits['min_fail'] and tile_size >= limits['min_fail']:
+                    # a previous failure was not repeated at this size, so forget it
+                    limits['min_fail'] = None
+            else:
+                limits['min_fail'] = min(limits['min_fail'] or tile_size, tile_size)
+                if limits['max_ok'] and limits['max_ok'] >= tile_size:
+                    limits['max_ok'] = None
+            self._tile_limits.set(key, limits)
+
+    @staticmethod
+    def _check_tile_limits(
+        max_tile_size: Optional[float] = None, max_tile_dim: Optional[int] = None
+    ) -> Tuple[int, int]:  # yapf: disable
+        """
+        Check `max_tile_size` (MB) and `max_tile_dim` (pixels) against the EE download limits.  Returns the maximum
+        tile size in bytes, and the maximum tile dimension, set to EE defaults where they are None.
         """
         # convert max_tile_size from MB to bytes & set to EE default if None
         if max_tile_size and (max_tile_size > BaseImage._ee_max_tile_size):
@@ -497,32 +728,132 @@ class BaseImage:
                 f'{BaseImage._ee_max_tile_size} pixels.'
             )
         max_tile_dim = max_tile_dim or BaseImage._ee_max_tile_dim   # set max_tile_dim to EE default if None
+        return max_tile_size, max_tile_dim
+
+    @staticmethod
+    def _get_tile_shape(
+        exp_image: 'BaseImage', max_tile_size: Optional[float] = None, max_tile_dim: Optional[int] = None,
+        tile_count: Optional[int] = None
+    ) -> Tuple[Tuple[int, int], int]:  # yapf: disable
+        """
+        Return a tile shape and number of tiles for a given BaseImage, such that the tile shape satisfies GEE
+        download limits, is 'square-ish', and the number of tiles is a minimum.  `tile_count` is the number of bands
+        in each tile, and defaults to the number of image bands.
+        """
+        max_tile_size, max_tile_dim = BaseImage._check_tile_limits(max_tile_size, max_tile_dim)
 
-        # find the total number of tiles the image must be divided into to satisfy max_tile_size
+        # find the maximum number of tile pixels that satisfies max_tile_size
         image_shape = np.array(exp_image.shape, dtype='int64')
-        dtype_size = np.dtype(exp_image.dtype).itemsize
-        image_size = exp_image.size
-        if exp_image.dtype.endswith('int8'):
-            # workaround for GEE overestimate of *int8 dtype download sizes
-            dtype_size *= 2
-            image_size *= 2
-
-        pixel_size = dtype_size * exp_image.count
-
-        num_tile_shape = np.array([1, 1], dtype='int64')
-        tile_size = image_size
-        tile_shape = image_shape
-        while tile_size >= max_tile_size:
-            div_axis = np.argmax(tile_shape)
-            num_tile_shape[div_axis] += 1  # increase the num tiles down the longest dimension of tile_shape
-            tile_shape = np.ceil(image_shape / num_tile_shape).astype('int64')
-            tile_size = tile_shape[0] * tile_shape[1] * pixel_size
-
-        tile_shape[tile_shape > max_tile_dim] = max_tile_dim
-        num_tiles = int(np.product(np.ceil(image_shape / tile_shape)))
-        tile_shape = tuple(tile_shape.tolist())
+        pixel_size = BaseImage._get_tile_dtype_size(exp_image.dtype) * (tile_count or exp_image.count)
+        max_tile_pixels = max((max_tile_size - 1) // pixel_size, 1)
+
+        # For every possible number of tile rows, find the tile height, and the number of tile columns and tile width
+        # that satisfy max_tile_pixels and max_tile_dim.  Then choose the combination with the fewest tiles, and the
+        # 'squarest' tile shape for combinations with the same number of tiles.  Tile dimensions are balanced across the
+        # image, so that edge tiles are as close to full size as possible.
+        num_tile_rows = np.arange(1, image_shape[0] + 1, dtype='int64')
+        tile_heights = -(-image_shape[0] // num_tile_rows)  # ceil division
+        max_tile_widths = np.minimum(max_tile_pixels // tile_heights, max_tile_dim)
+        valid = (tile_heights <= max_tile_dim) & (max_tile_widths >= 1)
+        num_tile_rows, tile_heights, max_tile_widths = num_tile_rows[valid], tile_heights[valid], max_tile_widths[valid]
+        num_tile_cols = -(-image_shape[1] // max_tile_widths)
+        tile_widths = -(-image_shape[1] // num_tile_cols)
+
+        num_tiles = num_tile_rows * num_tile_cols
+        aspect = np.abs(np.log(tile_heights / tile_widths))
+        idx = np.lexsort((aspect, num_tiles))[0]
+        tile_shape = (int(tile_heights[idx]), int(tile_widths[idx]))
+        num_tiles = int(num_tiles[idx])
         return tile_shape, num_tiles
 
+    @staticmethod
+    def _get_tile_split(
+        exp_image: 'BaseImage', max_tile_size: Optional[float] = None, max_tile_dim: Optional[int] = None
+    ) -> Tuple[int, Tuple[int, int], int]:  # yapf: disable
+        """
+        Return a tile band count, tile shape and total number of tiles for a given BaseImage, such that tiles satisfy
+        GEE download limits.  Tiles are split along the band axis, as well as the row and column axes, where this
+        reduces the total number of tiles (i.e. download requests).
+        """
+        # find the minimum number of band groups for which a single pixel satisfies max_tile_size
+        max_tile_bytes = int((max_tile_size or BaseImage._ee_max_tile_size) * (1 << 20))
+        dtype_size = BaseImage._get_tile_dtype_size(exp_image.dtype)
+        min_groups = min(max(-(-exp_image.count * dtype_size // (max_tile_bytes - 1)), 1), exp_image.count)
+
+        # search the distinct band group sizes, preferring fewer band groups when the number of tiles is the same
+        best_split = None
+        prev_tile_count = None
+        for num_groups in range(min_groups, exp_image.count + 1):
+            tile_count = -(-exp_image.count // num_groups)
+            if tile_count == prev_tile_count:
+                continue
+            prev_tile_count = tile_count
+            tile_shape, num_tiles = BaseImage._get_tile_shape(
+                exp_image, max_tile_size=max_tile_size, max_tile_dim=max_tile_dim, tile_count=tile_count
+            )
+            num_tiles *= -(-exp_image.count // tile_count)
+            if not best_split or num_tiles < best_split[2]:
+                best_split = (tile_count, tile_shape, num_tiles)
+        return best_split
+
+    @staticmethod
+    def _get_aligned_tile_shape(
+        exp_image: 'BaseImage', grid_phase: Tuple[int, int], max_tile_size: Optional[float] = None,
+        max_tile_dim: Optional[int] = None, tile_count: Optional[int] = None
+    ) -> Optional[Tuple[Tuple[int, int], int]]:  # yapf: disable
+        """
+        Return a tile shape and number of tiles for a given BaseImage, such that the tile shape satisfies GEE
+        download limits, and tile boundaries lie on the EE asset tile grid.  Tile dimensions are multiples of the
+        asset tile dimension, and `grid_phase` is the (row, column) pixel position in `exp_image` of an asset tile
+        boundary.  Returns None if no aligned tile shape satisfies the download limits.
+        """
+        max_tile_size, max_tile_dim = BaseImage._check_tile_limits(max_tile_size, max_tile_dim)
+        block_dim = BaseImage._ee_asset_tile_dim
+        image_shape = np.array(exp_image.shape, dtype='int64')
+        pixel_size = BaseImage._get_tile_dtype_size(exp_image.dtype) * (tile_count or exp_image.count)
+        max_tile_blocks = (max_tile_size - 1) // (pixel_size * block_dim * block_dim)
+        max_dim_blocks = max_tile_dim // block_dim
+        if min(max_tile_blocks, max_dim_blocks) < 1:
+            return None
+
+        def num_tiles_along(dim: int, phase: int, tile_dims: np.ndarray) -> np.ndarray:
+            """ Return the number of tiles along an image dimension, for tile boundaries at `phase` + k*`tile_dims`. """
+            if phase == 0:
+                return -(-dim // tile_dims)
+            return 1 + (-(-max(dim - phase, 0) // tile_dims))
+
+        # For every possible tile height (in asset tiles), find the widest tile width that satisfies the limits, then
+        # choose the combination with the fewest tiles, and the 'squarest' tile shape.
+        row_blocks = np.arange(1, min(max_dim_blocks, max_tile_blocks) + 1, dtype='int64')
+        row_blocks = row_blocks[(row_blocks - 1) * block_dim < image_shape[0] + block_dim]
+        col_blocks = np.minimum(max_tile_blocks // row_blocks, max_dim_blocks)
+        tile_heights, tile_widths = row_blocks * block_dim, col_blocks * block_dim
+        num_tiles = (
+            num_tiles_along(image_shape[0], grid_phase[0], tile_heights) *
+            num_tiles_along(image_shape[1], grid_phase[1], tile_widths)
+        )
+        aspect = np.abs(np.log(tile_heights / tile_widths))
+        idx = np.lexsort((aspect, num_tiles))[0]
+        return (int(tile_heights[idx]), int(tile_widths[idx])), int(num_tiles[idx])
+
+    def _get_source_grid_offset(self, exp_image: 'BaseImage') -> Optional[Tuple[int, int]]:
+        """
+        Return the (row, column) pixel offset of `exp_image`, prepared from the encapsulated image, in the encapsulated
+        image's (minimum scale band) pixel grid.  Returns None if `exp_image` is not on the source pixel grid.
+        """
+        if not self.has_fixed_projection or (exp_image.crs != self.crs) or not np.isclose(exp_image.scale, self.scale):
+            return None
+        src_transform, exp_transform = self.transform, exp_image.transform
+        if not np.allclose(
+            [src_transform.a, src_transform.b, src_transform.d, src_transform.e],
+            [exp_transform.a, exp_transform.b, exp_transform.d, exp_transform.e]
+        ):  # yapf: disable
+            return None
+        offset = np.array(~src_transform * (exp_transform.xoff, exp_transform.yoff))
+        if not np.allclose(offset, np.round(offset), atol=1e-3):
+            return None
+        return int(np.round(offset[1])), int(np.round(offset[0]))
+
     @staticmethod
     def _build_overviews(dataset: rio.io.DatasetWriter, max_num_levels: int = 8, min_ovw_pixels: int = 256):
         """ Build internal overviews, downsampled by successive powers of 2, for an open rasterio dataset. """
@@ -567,12 +898,68 @@ class BaseImage:
                 dataset.set_band_description(band_i + 1, clean_band_dict['name'])
             dataset.update_tags(band_i + 1, **clean_band_dict)
 
+    # numpy structured dtype of a tile plan, with one (row_off, col_off, height, width, band_off, band_count) record
+    # per tile
+    _tile_plan_dtype = np.dtype([
+        ('row_off', 'int64'), ('col_off', 'int64'), ('height', 'int64'), ('width', 'int64'), ('band_off', 'int64'),
+        ('band_count', 'int64')
+    ])  # yapf: disable
+
     @staticmethod
-    def _tiles(exp_image: 'BaseImage', tile_shape: Tuple[int, int]) -> Iterator[Tile]:
+    def _get_tile_mask(
+        exp_image: 'BaseImage', tile_shape: Tuple[int, int], geoms: List[Dict], grid_offset: Tuple[int, int] = (0, 0)
+    ) -> Optional[np.ndarray]:  # yapf: disable
         """
-        Iterator over downloadable image tiles.
+        Return a boolean mask of the tile grid, that is True for tiles intersecting all of `geoms` (geojson
+        geometries in WGS84), and False for tiles that can be skipped.  Returns None if no geometries are supplied.
+        `grid_offset` is as for :meth:`BaseImage._get_tile_plan`.
+        """
+        geoms = [geom for geom in geoms if isinstance(geom, dict)]
+        if len(geoms) == 0:
+            return None
+
+        grid_shape = tuple(-(-(np.array(exp_image.shape) - np.array(grid_offset)) // np.array(tile_shape)))
+        # geo-transform of the tile grid i.e. where one 'pixel' is one tile
+        grid_transform = (
+            exp_image.transform * rio.Affine.translation(grid_offset[1], grid_offset[0]) *
+            rio.Affine.scale(tile_shape[1], tile_shape[0])
+        )
+        tile_mask = np.ones(grid_shape, dtype='bool')
+        for geom in geoms:
+            if geom['type'] == 'LinearRing':
+                # EE footprints can be LinearRings, which rasterio cannot burn
+                geom = dict(type='Polygon', coordinates=[geom['coordinates']])
+            try:
+                geom = transform_geom('EPSG:4326', CRS.from_string(exp_image.crs), geom)
+                geom_mask = features.rasterize(
+                    [(geom, 1)], out_shape=grid_shape, transform=grid_transform, fill=0, all_touched=True,
+                    dtype='uint8'
+                ).astype('bool')
+            except Exception as ex:
+                # don't prune tiles with geometries that can't be reprojected or burnt
+                logger.debug(f'Could not create tile mask: {str(ex)}')
+                continue
+            # dilate the mask by one tile to allow for inaccuracies in the geometry and its reprojection
+            dilated_mask = geom_mask.copy()
+            dilated_mask[1:, :] |= geom_mask[:-1, :]
+            dilated_mask[:-1, :] |= geom_mask[1:, :]
+            dilated_mask[:, 1:] |= geom_mask[:, :-1]
+            dilated_mask[:, :-1] |= geom_mask[:, 1:]
+            tile_mask &= dilated_mask
+        return tile_mask
+
+    @staticmethod
+    def _get_tile_plan(
+        exp_image: 'BaseImage', tile_shape: Tuple[int, int], largest_first: bool = False,
+        tile_mask: Optional[np.ndarray] = None, tile_count: Optional[int] = None, grid_offset: Tuple[int, int] = (0, 0)
+    ) -> np.ndarray:  # yapf: disable
+        """
+        Return a tile plan that divides an image into adjoining tiles no bigger than `tile_shape`, and band groups
+        of no more than `tile_count` bands.
 
-        Divides an image into adjoining tiles no bigger than `tile_shape`.
+        The plan is a numpy structured array with ``row_off``, ``col_off``, ``height`` and ``width`` (pixels), and
+        ``band_off`` and ``band_count`` fields, and one record per tile.  It is small, and can be saved and loaded
+        with :func:`numpy.save` and :func:`numpy.load`.
 
         Parameters
         ----------
@@ -581,21 +968,88 @@ class BaseImage:
         tile_shape: Tuple[int, int]
             (row, column) tile shape to use (pixels). Use :meth:`BaseImage._get_tile_shape` to find a tile shape that
             satisfies the Earth Engine download limit for :param:`exp_image`.
+        largest_first: bool, optional
+            Order tiles by decreasing size (True), or in row-major order (False).  Ordering by size means the small,
+            clipped tiles along the right and bottom image edges are downloaded last, which keeps download threads
+            busy until the end of a tiled download.
+        tile_mask: numpy.ndarray, optional
+            Boolean mask of the tile grid, as returned by :meth:`BaseImage._get_tile_mask`.  Tiles where the mask is
+            False are excluded from the plan.
+        tile_count: int, optional
+            Number of bands per tile.  Use :meth:`BaseImage._get_tile_split` to find a tile band count and shape that
+            satisfy the Earth Engine download limit for :param:`exp_image`.  Defaults to the number of image bands.
+        grid_offset: Tuple[int, int], optional
+            (row, column) pixel offset of the tile grid origin from the image origin.  Offsets should be in the range
+            (-tile_shape, 0].  Use a non-zero offset to align tiles with another grid.  The first row and column of
+            tiles are then clipped to the image bounds.
+
+        Returns
+        -------
+        numpy.ndarray
+            Tile plan.
+        """
+        image_shape = np.array(exp_image.shape, dtype='int64')
+        tile_shape = np.array(tile_shape, dtype='int64')
+        row_starts, col_starts = [
+            starts.ravel() for starts in np.meshgrid(
+                np.arange(grid_offset[0], image_shape[0], tile_shape[0], dtype='int64'),
+                np.arange(grid_offset[1], image_shape[1], tile_shape[1], dtype='int64'),
+                indexing='ij',
+            )
+        ]  # yapf: disable
+        spatial_plan = np.empty(row_starts.size, dtype=BaseImage._tile_plan_dtype)
+        # clip tiles along the image edges to the image bounds
+        spatial_plan['row_off'] = np.maximum(row_starts, 0)
+        spatial_plan['col_off'] = np.maximum(col_starts, 0)
+        spatial_plan['height'] = np.minimum(row_starts + tile_shape[0], image_shape[0]) - spatial_plan['row_off']
+        spatial_plan['width'] = np.minimum(col_starts + tile_shape[1], image_shape[1]) - spatial_plan['col_off']
+        if tile_mask is not None:
+            spatial_plan = spatial_plan[tile_mask.ravel()]
+
+        # repeat the spatial tiles for each band group, clipping the last group to the image band count
+        tile_count = tile_count or exp_image.count
+        band_offs = np.arange(0, exp_image.count, tile_count, dtype='int64')
+        plan = np.tile(spatial_plan, len(band_offs))
+        plan['band_off'] = np.repeat(band_offs, len(spatial_plan))
+        plan['band_count'] = np.minimum(tile_count, exp_image.count - plan['band_off'])
+
+        if largest_first:
+            # use a stable sort so that tiles of the same size remain in row-major order
+            plan = plan[np.argsort(-(plan['height'] * plan['width'] * plan['band_count']), kind='stable')]
+        return plan
+
+    @staticmethod
+    def _tiles(exp_image: 'BaseImage', tile_shape: Tuple[int, int] = None, plan: np.ndarray = None,
+               largest_first: bool = False) -> Iterator[Tile]:  # yapf: disable
+        """
+        Iterator over downloadable image tiles.
+
+        Divides an image into adjoining tiles no bigger than `tile_shape`, or according to a tile `plan`.
+
+        Parameters
+        ----------
+        exp_image: BaseImage
+            Image to tile.
+        tile_shape: Tuple[int, int], optional
+            (row, column) tile shape to use (pixels). Use :meth:`BaseImage._get_tile_shape` to find a tile shape that
+            satisfies the Earth Engine download limit for :param:`exp_image`.  Ignored if `plan` is provided.
+        plan: numpy.ndarray, optional
+            Tile plan, as returned by :meth:`BaseImage._get_tile_plan`.
+        largest_first: bool, optional
+            Yield tiles in order of decreasing size (True), or in row-major order (False).  Ignored if `plan` is
+            provided.
 
         Yields
         -------
         Tile
             An image tile that can be downloaded.
         """
-
-        # split the image up into tiles of at most `tile_shape` dimension
-        image_shape = exp_image.shape
-        start_range = product(range(0, image_shape[0], tile_shape[0]), range(0, image_shape[1], tile_shape[1]))
-        for tile_start in start_range:
-            tile_stop = np.clip(np.add(tile_start, tile_shape), a_min=None, a_max=image_shape)
-            clip_tile_shape = (tile_stop - tile_start).tolist()  # tolist is just to convert to native int
-            tile_window = Window(tile_start[1], tile_start[0], clip_tile_shape[1], clip_tile_shape[0])
-            yield Tile(exp_image, tile_window)
+        if plan is None:
+            plan = BaseImage._get_tile_plan(exp_image, tile_shape, largest_first=largest_first)
+        # tolist() converts the plan to native int tuples, and Tile objects are created lazily, one at a time
+        for row_off, col_off, height, width, band_off, band_count in plan.tolist():
+            bands = None if band_count == exp_image.count else (band_off, band_count)
+            yield Tile(exp_image, Window(col_off, row_off, width, height), bands=bands)
 
     @staticmethod
     def monitor_export(task: ee.batch.Task, label: str = None):
@@ -683,9 +1137,124 @@ class BaseImage:
             self.monitor_export(task)
         return task
 
+    def _plan_download(
+        self, max_tile_size: Optional[float] = None, max_tile_dim: Optional[int] = None, prune_tiles: bool = False,
+        align_tiles: bool = False, **kwargs
+    ) -> Tuple['BaseImage', Dict, np.ndarray, Dict]:  # yapf: disable
+        """
+        Prepare the encapsulated image for download, and plan its download tiles.  If `prune_tiles` is True, tiles
+        outside the image footprint are excluded from the plan.  See :meth:`BaseImage.download`
+        for `align_tiles` details.
+
+        Returns the prepared image, a rasterio profile for the downloaded GeoTIFF, the tile plan (see
+        :meth:`BaseImage._get_tile_plan`), and a dictionary of ``tile_shape``, ``tile_count``, ``grid_offset`` and
+        ``num_pruned_tiles`` plan details.
+        """
+        # prepare (resample, convert, reproject) the image for download
+        exp_image, profile = self._prepare_for_download(**kwargs)
+
+        # reduce max_tile_size to the learned tile size limit for this image, if there is one
+        learned_tile_size = self._get_learned_tile_size(exp_image)
+        if learned_tile_size and not (max_tile_size and max_tile_size > self._ee_max_tile_size):
+            logger.debug(f'Using learned maximum tile size: {learned_tile_size:.2f} MB')
+            max_tile_size = min(max_tile_size or self._ee_max_tile_size, learned_tile_size)
+
+        # get the band count and dimensions of an image tile that will satisfy GEE download limits
+        tile_count, tile_shape, num_tiles = self._get_tile_split(
+            exp_image, max_tile_size=max_tile_size, max_tile_dim=max_tile_dim
+        )
+
+        # if the download is on the source grid, align tiles with the EE asset tiles, so that each download tile reads
+        # as few asset tiles as possible (provided this does not increase the number of download tiles by more than
+        # _max_aligned_tile_increase)
+        grid_offset = (0, 0)
+        src_offset = self._get_source_grid_offset(exp_image) if align_tiles else None
+        if src_offset and num_tiles > 1:
+            grid_phase = tuple(-off % self._ee_asset_tile_dim for off in src_offset)
+            aligned = self._get_aligned_tile_shape(
+                exp_image, grid_phase, max_tile_size=max_tile_size, max_tile_dim=max_tile_dim, tile_count=tile_count
+            )
+            max_num_tiles = int(num_tiles * (1 + self._max_aligned_tile_increase))
+            if aligned and (aligned[1] * -(-exp_image.count // tile_count) <= max_num_tiles):
+                tile_shape = aligned[0]
+                grid_offset = tuple((phase - dim) if phase > 0 else 0 for phase, dim in zip(grid_phase, tile_shape))
+                logger.debug(f'Aligning tiles with asset tiles. Grid offset: {grid_offset}')
+
+        # plan the download tiles, largest first so that the smaller edge tiles fill in at the end of the download
+        tile_mask = None
+        if prune_tiles:
+            # prune by footprint only: EE clips downloads to the region bounds, so tiles outside a non-rectangular
+            # region can still contain valid pixels
+            tile_mask = self._get_tile_mask(exp_image, tile_shape, [exp_image.footprint], grid_offset=grid_offset)
+        tile_plan = self._get_tile_plan(
+            exp_image, tile_shape, largest_first=True, tile_mask=tile_mask, tile_count=tile_count,
+            grid_offset=grid_offset
+        )
+        num_pruned_tiles = 0
+        if tile_mask is not None:
+            num_pruned_tiles = int(np.sum(~tile_mask)) * -(-exp_image.count // tile_count)
+        plan_info = dict(
+            tile_shape=tile_shape, tile_count=tile_count, grid_offset=grid_offset, num_pruned_tiles=num_pruned_tiles
+        )
+        return exp_image, profile, tile_plan, plan_info
+
+    def plan(
+        self, max_tile_size: Optional[float] = None, max_tile_dim: Optional[int] = None, throughput: float = 10.,
+        prune_tiles: bool = False, align_tiles: bool = False, **kwargs
+    ) -> Dict:  # yapf: disable
+        """
+        Plan a download of the encapsulated image, without downloading any image data.
+
+        The returned plan is JSON serialisable, and includes the tile shape, number of tiles, number of requests,
+        raw and estimated compressed download sizes, and the estimated download time.  By default, the plan describes
+        the tiles that :meth:`BaseImage.download` would fetch.
+
+        Parameters
+        ----------
+        max_tile_size: int, optional
+            Maximum tile size (MB).  If None, defaults to the Earth Engine download size limit (32 MB).
+        max_tile_dim: int, optional
+            Maximum tile width/height (pixels).  If None, defaults to Earth Engine download limit (10000).
+        throughput: float, optional
+            Expected download throughput (MB/s), used to estimate the download time.
+        prune_tiles: bool, optional
+            Whether to exclude tiles outside the image footprint, which contain no valid pixels, from the plan (they
+            are counted in ``num_pruned_tiles``).  Note that :meth:`BaseImage.download` fetches these tiles, so the
+            plan then no longer matches the download.  Defaults to False.
+        align_tiles: bool, optional
+            Whether to align download tiles with Earth Engine asset tiles.  See :meth:`BaseImage.download` for
+            details.
+        **kwargs
+            Optional keyword arguments to pass to :meth:`BaseImage.download` i.e. ``region``, ``crs``, ``scale``,
+            ``resampling``, ``dtype`` and ``scale_offset``.
+
+        Returns
+        -------
+        dict
+            Download plan.
+        """
+        exp_image, profile, tile_plan, plan_info = self._plan_download(
+            max_tile_size=max_tile_size, max_tile_dim=max_tile_dim, prune_tiles=prune_tiles, align_tiles=align_tiles,
+            **kwargs
+        )
+        raw_size = int(
+            np.sum(tile_plan['height'] * tile_plan['width'] * tile_plan['band_count']) *
+            np.dtype(exp_image.dtype).itemsize
+        )
+        est_size = int(raw_size * self._compress_ratio)
+        return dict(
+            id=self.id, crs=exp_image.crs, transform=tuple(exp_image.transform)[:6], shape=exp_image.shape,
+            count=exp_image.count, dtype=exp_image.dtype, **plan_info, num_tiles=len(tile_plan),
+            # each tile makes a getDownloadURL request, and a request for the download data
+            num_requests=2 * len(tile_plan), raw_size=raw_size, est_size=est_size,
+            est_time=est_size / (throughput * (1 << 20)),
+            tiles=tile_plan.tolist(),
+        )  # yapf: disable
+
     def download(
         self, filename: Union[pathlib.Path, str], overwrite: bool = False, num_threads: Optional[int] = None,
-        max_tile_size: Optional[float] = None, max_tile_dim: Optional[int] = None, **kwargs
+        max_tile_size: Optional[float] = None, max_tile_dim: Optional[int] = None, align_tiles: bool = False,
+        **kwargs
     ):
         """
         Download the encapsulated image to a GeoTiff file.
@@ -707,6 +1276,11 @@ class BaseImage:
             Maximum tile size (MB).  If None, defaults to the Earth Engine download size limit (32 MB).
         max_tile_dim: int, optional
             Maximum tile width/height (pixels).  If None, defaults to Earth Engine download limit (10000).
+        align_tiles: bool, optional
+            Experimental.  When downloading on the source pixel grid, offset and size download tiles to align with
+            the Earth Engine asset tiles, allowing up to 25% more download tiles.  This assumes assets are stored in
+            256 pixel tiles anchored at the source (minimum scale band) origin, which is not documented by Earth
+            Engine, and its effect on EE compute has not been measured.  Defaults to False.
         region : dict, ee.Geometry, optional
             Region defined by geojson polygon in WGS84.  Defaults to the entire image granule.
         crs : str, optional
@@ -733,22 +1307,24 @@ class BaseImage:
             else:
                 raise FileExistsError(f'{filename} exists')
 
-        # prepare (resample, convert, reproject) the image for download
-        exp_image, profile = self._prepare_for_download(**kwargs)
-
-        # get the dimensions of an image tile that will satisfy GEE download limits
-        tile_shape, num_tiles = self._get_tile_shape(exp_image, max_tile_size=max_tile_size, max_tile_dim=max_tile_dim)
+        # prepare (resample, convert, reproject) the image for download, and plan the download tiles
+        exp_image, profile, tile_plan, plan_info = self._plan_download(
+            max_tile_size=max_tile_size, max_tile_dim=max_tile_dim, align_tiles=align_tiles, **kwargs
+        )
+        tile_shape, tile_count = plan_info['tile_shape'], plan_info['tile_count']
 
         # find raw size of the download data (less than the actual download size as the image data is zipped in a
         # compressed geotiff)
-        raw_download_size = exp_image.size
+        dtype_size = np.dtype(exp_image.dtype).itemsize
+        raw_download_size = int(
+            np.sum(tile_plan['height'] * tile_plan['width'] * tile_plan['band_count']) * dtype_size
+        )
         if logger.getEffectiveLevel() <= logging.DEBUG:
-            dtype_size = np.dtype(exp_image.dtype).itemsize
-            raw_tile_size = tile_shape[0] * tile_shape[1] * exp_image.count * dtype_size
+            raw_tile_size = tile_shape[0] * tile_shape[1] * tile_count * dtype_size
             logger.debug(f'{filename.name}:')
             logger.debug(f'Uncompressed size: {self._str_format_size(raw_download_size)}')
-            logger.debug(f'Num. tiles: {num_tiles}')
-            logger.debug(f'Tile shape: {tile_shape}')
+            logger.debug(f'Num. tiles: {len(tile_plan)}')
+            logger.debug(f'Tile shape: {tile_shape}, band count: {tile_count}')
             logger.debug(f'Tile size: {self._str_format_size(int(raw_tile_size))}')
 
         if raw_download_size > 1e9:
@@ -772,25 +1348,51 @@ class BaseImage:
         redir_tqdm = logging_redirect_tqdm([logging.getLogger(__package__)])  # redirect logging through tqdm
         env = rio.Env(GDAL_NUM_THREADS='ALL_CPUs', GTIFF_FORCE_RGBA=False)
         with redir_tqdm, env, rio.open(filename, 'w', **profile) as out_ds, bar:
+            # event to signal running tile downloads to stop
+            stop_event = threading.Event()
+            # the largest successfully downloaded tile size, as counted by EE (bytes)
+            tile_dtype_size = self._get_tile_dtype_size(exp_image.dtype)
+            max_ok_tile_size = 0
 
             def download_tile(tile):
                 """Download a tile and write into the destination GeoTIFF. """
-                tile_array = tile.download(session=session, bar=bar)
-                with out_lock:
-                    out_ds.write(tile_array, window=tile.window)
+                nonlocal max_ok_tile_size
+                tile_size = tile.window.height * tile.window.width * len(tile.indexes) * tile_dtype_size
+                try:
+                    tile_array = tile.download(session=session, bar=bar, stop_event=stop_event)
+                except Exception as ex:
+                    if self._tile_limit_error_pattern.search(str(ex)):
+                        # remember that this tile size is too big for this kind of image
+                        self._record_tile_size(exp_image, tile_size, success=False)
+                    raise
+                if tile_array is not None:
+                    with out_lock:
+                        out_ds.write(tile_array, window=tile.window, indexes=tile.indexes)
+                        max_ok_tile_size = max(max_ok_tile_size, tile_size)
 
             with ThreadPoolExecutor(max_workers=max_threads) as executor:
-                # Run the tile downloads in a thread pool
-                tiles = self._tiles(exp_image, tile_shape=tile_shape)
-                futures = [executor.submit(download_tile, tile) for tile in tiles]
+                # Run the tile downloads in a thread pool.  Tiles are pulled from the _tiles() generator as threads
+                # become free, so that the number of queued tiles (and futures) is bounded by `max_queued`.
+                tiles = self._tiles(exp_image, plan=tile_plan)
+                max_queued = 2 * max_threads
+                futures = {executor.submit(download_tile, tile) for tile in islice(tiles, max_queued)}
                 try:
-                    for future in as_completed(futures):
-                        future.result()
+                    while futures:
+                        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                        futures.update(executor.submit(download_tile, tile) for tile in islice(tiles, len(done)))
                 except Exception as ex:
                     logger.info(f'Exception: {str(ex)}\nCancelling...')
-                    executor.shutdown(wait=False)
+                    # cancel queued tiles, and signal running tiles to stop, so that the executor shuts down promptly
+                    stop_event.set()
+                    for future in futures:
+                        future.cancel()
                     raise ex
 
+            if max_ok_tile_size > 0:
+                self._record_tile_size(exp_image, max_ok_tile_size, success=True)
+
             bar.update(bar.total - bar.n)   # ensure the bar reaches 100%
             # populate GeoTIFF metadata and build overviews
             self._write_metadata(out_ds)
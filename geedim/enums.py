@@ -15,6 +15,14 @@
 """
 from enum import Enum
 
+supported_dtypes = ['uint8', 'uint16', 'uint32', 'int8', 'int16', 'int32', 'float32', 'float64']
+""" Supported image data types for downloading/exporting. """
+# Note:
+# - while gdal >= 3.5 supports *int64 data type, there is a rasterio bug retrieving the *int64 nodata value,
+# so geedim will not support these types for now.
+# - the ordering of the list above is relevant to the auto dtype and should be: unsigned ints smallest - largest,
+# signed ints smallest to largest, float types smallest to largest.
+
 
 class CompositeMethod(str, Enum):
     """
@@ -14,10 +14,9 @@
     limitations under the License.
 """
 import logging
-from typing import Dict
+from typing import Dict, List
 
 import ee
-import geedim.schema
 from geedim.download import BaseImage
 from geedim.enums import CloudMaskMethod
 from geedim.utils import split_id, get_projection
@@ -29,6 +28,8 @@ logger = logging.getLogger(__name__)
 
 class MaskedImage(BaseImage):
     _default_mask = False
+    _comp_method = None  # composite method of composite images
+    _sample_seed = 0  # random seed for sampled region statistics, fixed so that statistics are repeatable
 
     def __init__(self, ee_image: ee.Image, mask: bool = _default_mask, region: dict = None, **kwargs):
         """
@@ -74,6 +75,7 @@ class MaskedImage(BaseImage):
         # TODO: consider adding proj_scale parameter here, rather than in _set_region_stats, then it can be re-used in
         #  S2 cloud masking and distance
         BaseImage.__init__(self, ee_image)
+        self._masked = False
         self._add_aux_bands(**kwargs)  # add any mask and cloud distance bands
         if region:
             self._set_region_stats(region)
@@ -128,17 +130,15 @@ class MaskedImage(BaseImage):
             ee.Algorithms.If(overwrite, self.ee_image.addBands(aux_image, overwrite=True), self.ee_image)
         )
 
-    def _set_region_stats(self, region: Dict = None, scale: float = None):
+    def _get_region_portions(
+        self, mask_names: List[str], region: Dict = None, scale: float = None, sample_size: int = None
+    ) -> ee.Dictionary:
         """
-        Set FILL_PORTION and CLOUDLESS_PORTION on the encapsulated image for the specified region.  Derived classes
-        should override this method and set CLOUDLESS_PORTION, and/or other statistics they support.
-
-        Parameters
-        ----------
-        region : dict, ee.Geometry, optional
-            Region inside of which to find statistics.  If not specified, the image footprint is used.
-        scale: float, optional
-            Re-project to this scale when finding statistics.
+        Return a dictionary of the portions (%) of the specified region covered by each of the `mask_names` mask
+        bands.  Dictionary keys are the mask band names with '_MASK' replaced by '_PORTION'.  If `sample_size` is
+        specified, the portions are estimated from a random sample of points, and the dictionary also includes their
+        95% (Wilson score) confidence interval half-widths with '_PORTION_CI' keys.  See :meth:`_set_region_stats`
+        for parameter details.
         """
         if not region:
             region = self.ee_image.geometry()  # use the image footprint
@@ -149,30 +149,94 @@ class MaskedImage(BaseImage):
         # need for _proj_scale.
         scale = scale or proj.nominalScale()
 
-        # Find the fill portion as the (sum over the region of FILL_MASK) divided by (sum over the region of a constant
+        # Find the portions as the (sum over the region of the masks) divided by (sum over the region of a constant
         # image (==1)).  We take this approach rather than using a mean reducer, as this does not find the mean over
         # the region, but the mean over the part of the region covered by the image.
+        portion_names = [mask_name.replace('_MASK', '_PORTION') for mask_name in mask_names]
         stats_image = ee.Image(
-            [self.ee_image.select('FILL_MASK').rename('FILL_PORTION').unmask(), ee.Image(1).rename('REGION_SUM')]
+            [self.ee_image.select(mask_names, portion_names).unmask(), ee.Image(1).rename('REGION_SUM')]
         )  # yapf: disable
+        if sample_size:
+            # Reduce over a fixed (seeded) random sample of points inside the region, so that the cost depends on
+            # the sample size, and not on the region area.  The scale is not changed with bestEffort in this case.
+            points = ee.FeatureCollection.randomPoints(ee.Geometry(region), sample_size, self._sample_seed)
+            reduce_kwargs = dict(geometry=points.geometry(), bestEffort=False)
+        else:
+            # bestEffort coarsens the scale for regions with more than maxPixels pixels at `scale`
+            reduce_kwargs = dict(geometry=region, bestEffort=True)
         # Note: sometimes proj has no EPSG in crs(), hence use crs=proj and not crs=proj.crs() below
-        sums_dict = stats_image.reduceRegion(
-            reducer="sum", geometry=region, crs=proj, scale=scale, bestEffort=True, maxPixels=1e6
-        )
+        sums = stats_image.reduceRegion(reducer="sum", crs=proj, scale=scale, maxPixels=1e6, **reduce_kwargs)
+        region_sum = ee.Number(sums.get("REGION_SUM"))
 
         def region_percentage(key, value):
-            return ee.Number(value).multiply(100).divide(ee.Number(sums_dict.get("REGION_SUM")))
-
-        means = sums_dict.select(['FILL_PORTION']).map(region_percentage)
+            return ee.Number(value).multiply(100).divide(region_sum)
+
+        portions = sums.select(portion_names).map(region_percentage)
+        if not sample_size:
+            return portions
+
+        def confidence_interval(key, value):
+            # Wilson score interval for the binomial proportion, where the sample size is the number of distinct
+            # pixels sampled.  Unlike the normal approximation, this is valid for portions near 0 or 100%.  The
+            # interval is not centred on the estimate, so the half-width returned is the distance from the estimate
+            # to the furthest interval bound.
+            prop = ee.Number(value).divide(100)
+            z2_n = ee.Number(1.96**2).divide(region_sum)
+            center = prop.add(z2_n.divide(2)).divide(z2_n.add(1))
+            half_width = (
+                prop.multiply(ee.Number(1).subtract(prop)).divide(region_sum).add(z2_n.divide(region_sum.multiply(4)))
+                .sqrt().multiply(1.96).divide(z2_n.add(1))
+            )  # yapf: disable
+            return center.subtract(prop).abs().add(half_width).multiply(100)
+
+        ci_names = [portion_name + '_CI' for portion_name in portion_names]
+        return portions.combine(portions.map(confidence_interval).rename(portion_names, ci_names))
+
+    def _set_region_stats(
+        self, region: Dict = None, scale: float = None, fill: bool = True, cloudless: bool = True,
+        sample_size: int = None
+    ):
+        """
+        Set FILL_PORTION and CLOUDLESS_PORTION on the encapsulated image for the specified region.  Derived classes
+        should override this method and set CLOUDLESS_PORTION, and/or other statistics they support.
 
-        # set the encapsulated image properties
-        self.ee_image = self.ee_image.set(means)
-        # set CLOUDLESS_PORTION=FILL_PORTION for the generic case, where cloud/shadow masking is not supported
-        self.ee_image = self.ee_image.set('CLOUDLESS_PORTION', means.get('FILL_PORTION'))
+        Parameters
+        ----------
+        region : dict, ee.Geometry, optional
+            Region inside of which to find statistics.  If not specified, the image footprint is used.
+        scale: float, optional
+            Re-project to this scale when finding statistics.
+        fill: bool, optional
+            Whether to set FILL_PORTION.
+        cloudless: bool, optional
+            Whether to set CLOUDLESS_PORTION.  If ``fill`` is False, FILL_PORTION should already be set.
+        sample_size: int, optional
+            Estimate statistics from a random sample of this many points inside the region, rather than from all
+            region pixels.  95% confidence interval half-widths (%) of the estimates are set in FILL_PORTION_CI
+            and CLOUDLESS_PORTION_CI.  If None (the default), statistics are found from all region pixels.  In this
+            case, the scale is coarsened for regions with more than 1e6 pixels at ``scale``, whereas sampled
+            statistics are always found at ``scale``.
+        """
+        if fill:
+            self.ee_image = self.ee_image.set(
+                self._get_region_portions(['FILL_MASK'], region=region, scale=scale, sample_size=sample_size)
+            )
+        if cloudless:
+            # set CLOUDLESS_PORTION=FILL_PORTION for the generic case, where cloud/shadow masking is not supported
+            self.ee_image = self.ee_image.set('CLOUDLESS_PORTION', self.ee_image.get('FILL_PORTION'))
+            if sample_size:
+                self.ee_image = self.ee_image.set('CLOUDLESS_PORTION_CI', self.ee_image.get('FILL_PORTION_CI'))
+
+    @property
+    def _expression_class(self) -> Dict:
+        expression_class = super()._expression_class
+        expression_class.update(composite=self._comp_method, mask=self._masked)
+        return expression_class
 
     def mask_clouds(self):
         """ Apply the cloud/shadow mask if supported, otherwise apply the fill mask. """
         self.ee_image = self.ee_image.updateMask(self.ee_image.select('FILL_MASK'))
+        self._masked = True
 
 
 class CloudMaskedImage(MaskedImage):
@@ -205,7 +269,10 @@ class CloudMaskedImage(MaskedImage):
         # download.
         return cloud_dist.toUint16().rename('CLOUD_DIST')
 
-    def _set_region_stats(self, region: Dict = None, scale: float = None):
+    def _set_region_stats(
+        self, region: Dict = None, scale: float = None, fill: bool = True, cloudless: bool = True,
+        sample_size: int = None
+    ):
         """
         Set FILL_PORTION and CLOUDLESS_PORTION on the encapsulated image for the specified region.
 
@@ -215,32 +282,24 @@ class CloudMaskedImage(MaskedImage):
             Region inside of which to find statistics.  If not specified, the image footprint is used.
         scale: float, optional
             Re-project to this scale when finding statistics.
+        fill: bool, optional
+            Whether to set FILL_PORTION.
+        cloudless: bool, optional
+            Whether to set CLOUDLESS_PORTION.
+        sample_size: int, optional
+            Estimate statistics from a random sample of this many points inside the region, rather than from all
+            region pixels.  95% confidence interval half-widths (%) of the estimates are set in FILL_PORTION_CI
+            and CLOUDLESS_PORTION_CI.  If None (the default), statistics are found from all region pixels.  In this
+            case, the scale is coarsened for regions with more than 1e6 pixels at ``scale``, whereas sampled
+            statistics are always found at ``scale``.
         """
-        if not region:
-            region = self.ee_image.geometry()  # use the image footprint
-
-        proj = get_projection(self.ee_image, min_scale=False)  # get projection of minimum scale band
-        # If _proj_scale is set, use that as the scale, otherwise use the proj.nomimalScale().  For non-composite images
-        # these should be the same value.  For composite images, there is no `fixed` projection, hence the
-        # need for _proj_scale.
-        scale = scale or proj.nominalScale()
-
-        # Find the fill portion as the (sum over the region of FILL_MASK) divided by (sum over the region of a constant
-        # image (==1)).  We take this approach rather than using a mean reducer, as this does not find the mean over
-        # the region, but the mean over the part of the region covered by the image.
-        stats_image = ee.Image(
-            [self.ee_image.select(['FILL_MASK', 'CLOUDLESS_MASK']).unmask(), ee.Image(1).rename('REGION_SUM')]
-        )  # yapf: disable
-        sums = stats_image.reduceRegion(
-            reducer="sum", geometry=region, crs=proj, scale=scale, bestEffort=True, maxPixels=1e6
-        ).rename(['FILL_MASK', 'CLOUDLESS_MASK'], ['FILL_PORTION', 'CLOUDLESS_PORTION'])
-
-        def region_percentage(key, value):
-            return ee.Number(value).multiply(100).divide(ee.Number(sums.get("REGION_SUM")))
-
-        means = sums.select(['FILL_PORTION', 'CLOUDLESS_PORTION']).map(region_percentage)
-        # set the encapsulated image properties
-        self.ee_image = self.ee_image.set(means)
+        # only the required masks are reduced, so that e.g. the cloud/shadow mask is not computed when only the fill
+        # portion is required
+        mask_names = [name for name, req in zip(['FILL_MASK', 'CLOUDLESS_MASK'], [fill, cloudless]) if req]
+        if mask_names:
+            self.ee_image = self.ee_image.set(
+                self._get_region_portions(mask_names, region=region, scale=scale, sample_size=sample_size)
+            )
 
     def _aux_image(self, **kwargs) -> ee.Image:
         """
@@ -254,6 +313,7 @@ class CloudMaskedImage(MaskedImage):
     def mask_clouds(self):
         """ Apply the cloud/shadow mask. """
         self.ee_image = self.ee_image.updateMask(self.ee_image.select('CLOUDLESS_MASK'))
+        self._masked = True
 
 
 class LandsatImage(CloudMaskedImage):
@@ -459,6 +519,8 @@ class Sentinel2ToaClImage(Sentinel2ClImage):
 
 def class_from_id(image_id: str) -> type:
     """ Return the *Image class that corresponds to the provided Earth Engine image/collection ID. """
+    # import here to avoid a circular import with geedim.schema, which refers to the classes in this module
+    import geedim.schema
     ee_coll_name, _ = split_id(image_id)
     if image_id in geedim.schema.collection_schema:
         return geedim.schema.collection_schema[image_id]['image_type']
@@ -0,0 +1,282 @@
+"""
+    Copyright 2021 Dugal Harris - dugalh@gmail.com
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+# Sentinel-2 MGRS tile bounds, for limiting searches to the tiles that intersect a region with an image property
+# filter, rather than (slower) footprint geometry intersection.  Tile bounds are found from the MGRS grid definition,
+# for the grid cells near a region only.
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+
+import ee
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Scene grids, and the image property that identifies a scene
+grid_props = {'mgrs': 'MGRS_TILE'}
+
+# margin (degrees) added to scene bounds to allow for variation in footprints between acquisitions
+_bounds_margin = 0.05
+# maximum number of scenes to filter on, beyond which the filter is not worth its size
+_max_scenes = 1000
+
+# MGRS latitude band letters (from 80S in 8 degree bands, with X extended to 84N), and 100 km square column and row
+# letters (column letters cycle with the UTM zone)
+_mgrs_band_letters = 'CDEFGHJKLMNPQRSTUVWX'
+_mgrs_col_letters = ['ABCDEFGH', 'JKLMNPQR', 'STUVWXYZ']
+_mgrs_row_letters = 'ABCDEFGHJKLMNPQRSTUV'
+# MGRS zone exceptions for southern Norway and Svalbard, as (zone, band, (lon_min, lon_max)).  Tiles are found for
+# these as well as the standard zones.
+_mgrs_zone_exceptions = [
+    (32, 'V', (3, 12)), (31, 'X', (0, 9)), (33, 'X', (9, 21)), (35, 'X', (21, 33)), (37, 'X', (33, 42))
+]
+# Sentinel-2 tiles are 109.8 km squares with the top left corner of an MGRS 100 km square
+_s2_tile_size = 109800
+
+
+def _get_geojson_lines(geometry: Dict) -> List[np.ndarray]:
+    """ Return the vertex sequences (rings and line strings) of a GeoJSON geometry as N x 2 arrays. """
+    if geometry['type'] == 'GeometryCollection':
+        return [line for sub_geometry in geometry['geometries'] for line in _get_geojson_lines(sub_geometry)]
+    # number of nesting levels above the vertex sequences in 'coordinates'
+    levels = {'Point': None, 'MultiPoint': None, 'LineString': 0, 'LinearRing': 0, 'Polygon': 1,
+              'MultiLineString': 1, 'MultiPolygon': 2}[geometry['type']]  # yapf: disable
+    if levels is None:
+        return []
+    lines = [geometry['coordinates']]
+    for _ in range(levels):
+        lines = [line for group in lines for line in group]
+    return [np.array(line, dtype=float)[:, :2] for line in lines if len(line) > 1]
+
+
+def _get_geodesic_lat_bounds(lines: List[np.ndarray]) -> Optional[Tuple[float, float]]:
+    """
+    Return the (min, max) latitude of the geodesic (great circle) edges between consecutive vertices in `lines`, or
+    None if there are no edges.  Geodesic edges bulge towards the poles, beyond the latitudes of their vertices.
+    """
+    if not lines:
+        return None
+    starts = np.concatenate([line[:-1] for line in lines])
+    ends = np.concatenate([line[1:] for line in lines])
+
+    def to_xyz(lon_lat: np.ndarray) -> np.ndarray:
+        lon, lat = np.radians(lon_lat).T
+        return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=1)
+
+    a, b = to_xyz(starts), to_xyz(ends)
+    lats = np.concatenate([starts[:, 1], ends[:, 1]])
+    # the highest point of each great circle is its projection of the north pole, which is on the edge if it lies
+    # between the edge vertices; the lowest point is its negation
+    normal = np.cross(a, b)
+    pole = np.array([0., 0., 1.])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+        top = pole - (normal @ pole)[:, None] * normal
+        top /= np.linalg.norm(top, axis=1, keepdims=True)
+    for extreme in [top, -top]:
+        on_edge = (
+            (np.einsum('ij,ij->i', np.cross(a, extreme), normal) >= 0) &
+            (np.einsum('ij,ij->i', np.cross(extreme, b), normal) >= 0)
+        )  # yapf: disable
+        on_edge &= np.all(np.isfinite(extreme), axis=1)
+        lats = np.concatenate([lats, np.degrees(np.arcsin(np.clip(extreme[on_edge, 2], -1, 1)))])
+    return lats.min(), lats.max()
+
+
+def _get_region_bounds(region: Union[Dict, ee.Geometry]) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Return WGS84 (xmin, ymin, xmax, ymax) bounds that contain `region`, or None if they cannot be found on the client.
+    Unless the region is planar (``geodesic=False``), latitude bounds are extended to contain its geodesic edges, and
+    None is returned if a geodesic edge crosses the antimeridian.
+    """
+    if isinstance(region, ee.Geometry):
+        try:
+            # toGeoJSON() is client side, and raises an exception for computed geometries
+            region = region.toGeoJSON()
+        except ee.EEException:
+            return None
+    if not isinstance(region, dict):
+        return None
+
+    from rasterio.features import bounds
+    try:
+        crs = region.get('crs', {}).get('properties', {}).get('name', 'EPSG:4326')
+        if crs not in ['EPSG:4326', 'urn:ogc:def:crs:OGC:1.3:CRS84']:
+            return None
+        region_bounds = bounds(region)
+        if region.get('geodesic', True):
+            lines = _get_geojson_lines(region)
+            if any([np.any(np.abs(np.diff(line[:, 0])) > 180) for line in lines]):
+                # geodesic edges that cross the antimeridian are outside the longitude bounds of their vertices
+                return None
+            lat_bounds = _get_geodesic_lat_bounds(lines)
+            if lat_bounds:
+                xmin, ymin, xmax, ymax = region_bounds
+                region_bounds = (xmin, min(ymin, lat_bounds[0]), xmax, max(ymax, lat_bounds[1]))
+    except (KeyError, TypeError, ValueError, IndexError, AttributeError):
+        return None
+    return region_bounds
+
+
+@lru_cache(maxsize=None)
+def _get_mgrs_cell_tiles(zone: int, band: str, lon_min: float, lon_max: float) -> Tuple[List[str], np.ndarray]:
+    """
+    Return the IDs and WGS84 bounds (as an N x 4 array of [xmin, ymin, xmax, ymax]) of the Sentinel-2 tiles that
+    intersect the given MGRS zone and latitude band cell.  Longitude bounds of tiles that cross the antimeridian
+    extend beyond [-180, 180].
+    """
+    from rasterio.warp import transform
+
+    def densify(xmin: float, ymin: float, xmax: float, ymax: float, num: int = 10) -> np.ndarray:
+        """ Return a 2 x (4 * num) array of points on the boundary of the given bounds. """
+        steps = np.linspace(0, 1, num, endpoint=False)
+        xs = np.concatenate([xmin + (xmax - xmin) * steps, np.full(num, xmax), xmax - (xmax - xmin) * steps,
+                             np.full(num, xmin)])  # yapf: disable
+        ys = np.concatenate([np.full(num, ymin), ymin + (ymax - ymin) * steps, np.full(num, ymax),
+                             ymax - (ymax - ymin) * steps])  # yapf: disable
+        return np.stack([xs, ys])
+
+    lat_min = -80 + _mgrs_band_letters.index(band) * 8
+    lat_max = 84 if band == 'X' else lat_min + 8
+    crs = f'EPSG:{(32700 if band < "N" else 32600) + zone}'
+    cell_xs, cell_ys = transform('EPSG:4326', crs, *densify(lon_min, lat_min, lon_max, lat_max))
+
+    # find the tiles that intersect the UTM bounds of the cell (tiles extend beyond their 100 km squares to the east
+    # and south), with their IDs and boundaries
+    overlap = _s2_tile_size - 1e5
+    cols = range(max(int(np.floor((min(cell_xs) - overlap) / 1e5)), 1), min(int(np.ceil(max(cell_xs) / 1e5)), 9))
+    rows = range(int(np.floor(min(cell_ys) / 1e5)), int(np.ceil((max(cell_ys) + overlap) / 1e5)))
+    tile_ids, tile_boundaries = [], []
+    for col in cols:
+        for row in rows:
+            col_letter = _mgrs_col_letters[(zone - 1) % 3][col - 1]
+            row_letter = _mgrs_row_letters[(row + (5 if zone % 2 == 0 else 0)) % 20]
+            tile_ids.append(f'{zone:02d}{band}{col_letter}{row_letter}')
+            top = (row + 1) * 1e5
+            tile_boundaries.append(densify(col * 1e5, top - _s2_tile_size, col * 1e5 + _s2_tile_size, top))
+
+    # find the WGS84 bounds of the tiles, rounded outwards
+    lons, lats = transform(crs, 'EPSG:4326', *np.hstack(tile_boundaries))
+    # unwrap longitudes about the zone central meridian, so that tiles crossing the antimeridian have bounds outside
+    # [-180, 180], rather than bounds spanning the globe
+    central_lon = -183 + zone * 6
+    lons = central_lon + (np.array(lons) - central_lon + 180) % 360 - 180
+    lons = np.reshape(lons, (len(tile_ids), -1))
+    lats = np.reshape(lats, (len(tile_ids), -1))
+    tile_bounds = np.stack(
+        [np.floor(lons.min(axis=1) * 1e3), np.floor(lats.min(axis=1) * 1e3), np.ceil(lons.max(axis=1) * 1e3),
+         np.ceil(lats.max(axis=1) * 1e3)], axis=1
+    ) / 1e3  # yapf: disable
+
+    # return the tiles that intersect the cell
+    intersects = (
+        (tile_bounds[:, 0] < lon_max) & (tile_bounds[:, 2] > lon_min) &
+        (tile_bounds[:, 1] < lat_max) & (tile_bounds[:, 3] > lat_min)
+    )  # yapf: disable
+    return [tile_id for tile_id, intersect in zip(tile_ids, intersects) if intersect], tile_bounds[intersects]
+
+
+@lru_cache(maxsize=None)
+def _get_mgrs_band_bounds(band: str) -> np.ndarray:
+    """
+    Return the bounds of the union of Sentinel-2 tiles in a standard MGRS cell of the given latitude band, with
+    longitudes relative to the zone central meridian.  These are the same for all zones.
+    """
+    _, tile_bounds = _get_mgrs_cell_tiles(31, band, 0, 6)
+    return np.array([
+        tile_bounds[:, 0].min() - 3, tile_bounds[:, 1].min(), tile_bounds[:, 2].max() - 3, tile_bounds[:, 3].max()
+    ])  # yapf: disable
+
+
+def _intersects(bounds: np.ndarray, region_bounds: Tuple[float, float, float, float]) -> np.ndarray:
+    """ Return a mask of the `bounds` rows (N x 4 array of [xmin, ymin, xmax, ymax]) that intersect `region_bounds`. """
+    mask = np.zeros(len(bounds), dtype=bool)
+    # bounds can extend beyond [-180, 180] for scenes that cross the antimeridian, so the region bounds are tested
+    # with longitude offsets of 0 and +-360
+    for lon_offset in [0, -360, 360]:
+        mask |= (
+            (bounds[:, 0] <= region_bounds[2] + lon_offset) & (bounds[:, 2] >= region_bounds[0] + lon_offset) &
+            (bounds[:, 1] <= region_bounds[3]) & (bounds[:, 3] >= region_bounds[1])
+        )  # yapf: disable
+    return mask
+
+
+def _get_mgrs_tiles(region_bounds: Tuple[float, float, float, float]) -> Optional[List[str]]:
+    """
+    Return the sorted IDs of the Sentinel-2 tiles whose bounds (plus :attr:`_bounds_margin`) intersect
+    `region_bounds`, or None if there are more than :attr:`_max_scenes` of them.  Tiles are found only for the MGRS
+    cells whose tiles can intersect the region, so that small regions are quick to test.
+    """
+    # find the standard cells whose tiles can intersect the region, from the band tile bounds offset to each zone
+    zones = np.arange(1, 61)
+    zone_offsets = np.outer(-183 + zones * 6, [1, 0, 1, 0])
+    cells = []
+    for band in _mgrs_band_letters:
+        cell_bounds = _get_mgrs_band_bounds(band) + zone_offsets + np.array([-1, -1, 1, 1]) * _bounds_margin
+        intersects = _intersects(cell_bounds, region_bounds)
+        cells += [(zone, band, (-186 + zone * 6, -180 + zone * 6)) for zone in zones[intersects].tolist()]
+
+    # find the tiles in those cells (and in the zone exceptions) that intersect the region
+    tile_ids = set()
+    for zone, band, lon_range in cells + _mgrs_zone_exceptions:
+        cell_ids, tile_bounds = _get_mgrs_cell_tiles(zone, band, *lon_range)
+        tile_bounds = tile_bounds + np.array([-1, -1, 1, 1]) * _bounds_margin
+        tile_ids.update([tile_id for tile_id, intersect in zip(cell_ids, _intersects(tile_bounds, region_bounds))
+                         if intersect])  # yapf: disable
+        if len(tile_ids) > _max_scenes:
+            return None
+    return sorted(tile_ids)
+
+
+def get_scene_values(grid_name: str, region: Union[Dict, ee.Geometry]) -> Optional[List]:
+    """
+    Return the identifying property values of the `grid_name` scenes whose bounds intersect `region`.  Returns None
+    if the grid is not supported, the region bounds cannot be found on the client, or the region intersects more than
+    :attr:`_max_scenes` scenes.
+
+    Parameters
+    ----------
+    grid_name: str
+        Scene grid name (a :attr:`grid_props` key).
+    region: dict, ee.Geometry
+        Region in WGS84.
+
+    Returns
+    -------
+    list, None
+        Sorted :attr:`grid_props` property values of the intersecting scenes.
+    """
+    if grid_name not in grid_props:
+        return None
+    region_bounds = _get_region_bounds(region)
+    if not region_bounds:
+        return None
+    return _get_mgrs_tiles(region_bounds)
+
+
+def get_scene_filter(grid_name: str, region: Union[Dict, ee.Geometry]) -> Optional[ee.Filter]:
+    """
+    Return an image property filter that selects the `grid_name` scenes intersecting `region`.  Returns None if the
+    filter cannot be found, or it selects no scenes, or more than :attr:`_max_scenes` scenes.  (A region with no
+    scenes is left to :meth:`ee.ImageCollection.filterBounds`, rather than assumed to have no images.)
+
+    Scene bounds are approximate, and the filter should be followed by :meth:`ee.ImageCollection.filterBounds` for
+    an exact intersection test.  See :func:`get_scene_values` for parameter details.
+    """
+    values = get_scene_values(grid_name, region)
+    if not values:
+        return None
+    return ee.Filter.inList(grid_props[grid_name], values)
@@ -48,11 +48,22 @@ s2_prop_schema = {
     'MEAN_INCIDENCE_ZENITH_ANGLE_B1': {'abbrev': 'VZA', 'description': 'View (B1) zenith angle (deg)'}
 }
 
+# confidence intervals of sampled region statistics (see MaskedCollection.search())
+sample_prop_schema = {
+    'FILL_PORTION_CI': {'abbrev': 'FILL_CI', 'description': 'Portion of valid pixels 95% confidence interval (+-%)'},
+    'CLOUDLESS_PORTION_CI': {
+        'abbrev': 'CLOUDLESS_CI', 'description': 'Portion of cloud/shadow free pixels 95% confidence interval (+-%)'
+    },
+}
+
 collection_schema = {
     'LANDSAT/LT04/C02/T1_L2': {
         'gd_coll_name': 'l4-c2-l2',
         'prop_schema': landsat_prop_schema,
         'image_type': geedim.mask.LandsatImage,
+        'revisit': 16,
+        'scene_cloud_prop': 'CLOUD_COVER',
+        'scene_index': None,
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/LANDSAT_LT04_C02_T1_L2',
         'description': 'Landsat 4, collection 2, tier 1, level 2 surface reflectance.'
     },
@@ -60,6 +71,9 @@ collection_schema = {
         'gd_coll_name': 'l5-c2-l2',
         'prop_schema': landsat_prop_schema,
         'image_type': geedim.mask.LandsatImage,
+        'revisit': 16,
+        'scene_cloud_prop': 'CLOUD_COVER',
+        'scene_index': None,
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/LANDSAT_LT05_C02_T1_L2',
         'description': 'Landsat 5, collection 2, tier 1, level 2 surface reflectance.'
     },
@@ -67,6 +81,9 @@ collection_schema = {
         'gd_coll_name': 'l7-c2-l2',
         'prop_schema': landsat_prop_schema,
         'image_type': geedim.mask.LandsatImage,
+        'revisit': 16,
+        'scene_cloud_prop': 'CLOUD_COVER',
+        'scene_index': None,
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/LANDSAT_LE07_C02_T1_L2',
         'description': 'Landsat 7, collection 2, tier 1, level 2 surface reflectance.'
     },
@@ -74,6 +91,9 @@ collection_schema = {
         'gd_coll_name': 'l8-c2-l2',
         'prop_schema': landsat_prop_schema,
         'image_type': geedim.mask.LandsatImage,
+        'revisit': 16,
+        'scene_cloud_prop': 'CLOUD_COVER',
+        'scene_index': None,
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/LANDSAT_LC08_C02_T1_L2',
         'description': 'Landsat 8, collection 2, tier 1, level 2 surface reflectance.'
     },
@@ -81,6 +101,9 @@ collection_schema = {
         'gd_coll_name': 'l9-c2-l2',
         'prop_schema': landsat_prop_schema,
         'image_type': geedim.mask.LandsatImage,
+        'revisit': 16,
+        'scene_cloud_prop': 'CLOUD_COVER',
+        'scene_index': None,
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/LANDSAT_LC09_C02_T1_L2',
         'description': 'Landsat 9, collection 2, tier 1, level 2 surface reflectance.'
     },
@@ -88,6 +111,9 @@ collection_schema = {
         'gd_coll_name': 's2-toa',
         'prop_schema': s2_prop_schema,
         'image_type': geedim.mask.Sentinel2ToaClImage,
+        'revisit': 5,
+        'scene_cloud_prop': 'CLOUDY_PIXEL_PERCENTAGE',
+        'scene_index': 'mgrs',
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/COPERNICUS_S2',
         'description': 'Sentinel-2, level 1C, top of atmosphere reflectance.'
     },
@@ -95,6 +121,9 @@ collection_schema = {
         'gd_coll_name': 's2-sr',
         'prop_schema': s2_prop_schema,
         'image_type': geedim.mask.Sentinel2SrClImage,
+        'revisit': 5,
+        'scene_cloud_prop': 'CLOUDY_PIXEL_PERCENTAGE',
+        'scene_index': 'mgrs',
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/COPERNICUS_S2_SR',
         'description': 'Sentinel-2, level 2A, surface reflectance.'
     },
@@ -102,6 +131,9 @@ collection_schema = {
         'gd_coll_name': 's2-toa-hm',
         'prop_schema': s2_prop_schema,
         'image_type': geedim.mask.Sentinel2ToaClImage,
+        'revisit': 5,
+        'scene_cloud_prop': 'CLOUDY_PIXEL_PERCENTAGE',
+        'scene_index': 'mgrs',
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/COPERNICUS_S2_HARMONIZED',
         'description': 'Harmonised Sentinel-2, level 1C, top of atmosphere reflectance.'
     },
@@ -109,6 +141,9 @@ collection_schema = {
         'gd_coll_name': 's2-sr-hm',
         'prop_schema': s2_prop_schema,
         'image_type': geedim.mask.Sentinel2SrClImage,
+        'revisit': 5,
+        'scene_cloud_prop': 'CLOUDY_PIXEL_PERCENTAGE',
+        'scene_index': 'mgrs',
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/COPERNICUS_S2_SR_HARMONIZED',
         'description': 'Harmonised Sentinel-2, level 2A, surface reflectance.'
     },
@@ -116,6 +151,9 @@ collection_schema = {
         'gd_coll_name': 'modis-nbar',
         'prop_schema': default_prop_schema,
         'image_type': geedim.mask.MaskedImage,
+        'revisit': 1,
+        'scene_cloud_prop': None,
+        'scene_index': None,
         'ee_url': 'https://developers.google.com/earth-engine/datasets/catalog/MODIS_006_MCD43A4',
         'description': 'MODIS nadir BRDF adjusted daily reflectance.'
     }
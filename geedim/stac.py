@@ -15,16 +15,34 @@
 """
 import json
 import logging
+import os
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Union
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Dict, Union, Tuple, Optional
 
+import requests
 from geedim import utils
+from geedim.cache import DiskCache
 
 logger = logging.getLogger(__name__)
 root_stac_url = 'https://earthengine-stac.storage.googleapis.com/catalog/catalog.json'
 
 
+def _write_json(filename: Union[str, Path], obj: Dict):
+    """ Write `obj` to the json `filename` atomically, so that readers never see a partially written file. """
+    filename = Path(filename)
+    tmp_filename = filename.with_name(f'.{filename.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_filename, 'w') as f:
+            json.dump(obj, f)
+        os.replace(tmp_filename, filename)
+    finally:
+        if tmp_filename.exists():
+            tmp_filename.unlink()
+
+
 class StacItem:
 
     def __init__(self, name: str, item_dict: Dict):
@@ -118,6 +136,12 @@ class StacItem:
 
 @utils.singleton
 class StacCatalog:
+    # time (s) after which a disk cached STAC item is revalidated with the server
+    _revalidate_interval = 24 * 3600
+    # on-disk caches of STAC dicts, and of EE STAC tree node summaries for incremental refresh of `url_dict`
+    _disk_cache: Optional[DiskCache] = None
+    _node_cache: Optional[DiskCache] = None
+    _max_crawl_threads = 16
 
     def __init__(self):
         """ Singleton class to interface to the EE STAC, and retrieve image/collection STAC data. """
@@ -125,7 +149,27 @@ class StacCatalog:
         self._session = utils.retry_session()
         self._url_dict = None
         self._cache = {}
+        self._items = {}
         self._lock = threading.Lock()
+        self._name_locks = {}
+
+    def enable_cache(self, enable: bool = True, max_items: int = 1000):
+        """
+        Enable or disable persistent, on-disk caches of STAC dicts and EE STAC tree nodes.
+
+        Cached STAC dicts are revalidated with the server once they are older than a day, and cached tree nodes
+        allow :meth:`write_url_dict` to skip unchanged parts of the EE STAC tree.  The caches are stored in the
+        geedim cache directory (see :func:`geedim.cache.cache_dir`), and are disabled by default.
+
+        Parameters
+        ----------
+        enable: bool, optional
+            Whether to enable (True) or disable (False) the caches.
+        max_items: int, optional
+            Maximum number of STAC dicts to keep in the cache.
+        """
+        self._disk_cache = DiskCache('stac', max_items=max_items) if enable else None
+        self._node_cache = DiskCache('stac_nodes') if enable else None
 
     @property
     def url_dict(self) -> Dict[str, str]:
@@ -136,35 +180,84 @@ class StacCatalog:
                 self._url_dict = json.load(f)
         return self._url_dict
 
-    def _traverse_stac(self, url: str, url_dict: Dict) -> Dict:
+    def _read_stac_node(self, url: str, parent_unchanged: bool = False) -> Tuple[Optional[Dict], bool]:
         """
-        Recursive & threaded EE STAC tree traversal that returns the `url_dict` i.e. a dict with image/collection
-        IDs/names as keys, and the corresponding json STAC URLs as values.
+        Return a summary dict of the EE STAC node at `url`, and a flag indicating whether the node is unchanged
+        since it was last read.  Nodes are revalidated with ETag / Last-Modified conditional requests against the
+        node cache.  Leaf nodes whose parent is unchanged are taken from the node cache without a request.  Returns
+        None for the summary dict if the node could not be read.
+
+        The summary dict contains ``leaf``, a flag indicating whether the node is a collection leaf node; ``id``,
+        the image / image collection ID of a leaf node (None if the leaf is not an image / image collection); and
+        ``children``, a list of child node URLs.
         """
-        response = self._session.get(url)
+        entry = self._node_cache.get(url) if self._node_cache else None
+        if parent_unchanged and entry and entry['leaf']:
+            return entry, True
+
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self._session.get(url, headers=headers)
+        except requests.exceptions.RequestException as ex:
+            logger.warning(f'Error reading {url}: {str(ex)}')
+            return None, False
+
+        if headers and (response.status_code == 304):
+            return entry, True
         if not response.ok:
             logger.warning(f'Error reading {url}: ' + str(response.content))
-            return url_dict
+            return None, False
+
         response_dict = response.json()
+        entry = dict(
+            etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'), leaf=False,
+            id=None, children=[]
+        )
         if 'type' in response_dict:
-            if (response_dict['type'].lower() == 'collection'):
+            if response_dict['type'].lower() == 'collection':
                 # we have reached a leaf node
+                entry.update(leaf=True)
                 if (('gee:type' in response_dict) and
                     (response_dict['gee:type'].lower() in ['image_collection', 'image'])):
                     # we have reached an image / image collection leaf node
-                    with self._lock:
-                        url_dict[response_dict['id']] = url
-                        logger.debug(f'ID: {response_dict["id"]}, Type: {response_dict["gee:type"]}, URL: {url}')
-                return url_dict
-
-            with ThreadPoolExecutor() as executor:
-                # traverse the sub-tree links in a thread pool
-                futures = []
-                for link in response_dict['links']:
-                    if link['rel'].lower() == 'child':
-                        futures.append(executor.submit(self._traverse_stac, link['href'], url_dict))
-                for future in as_completed(futures):
-                    url_dict = future.result()
+                    entry.update(id=response_dict['id'])
+            else:
+                entry.update(
+                    children=[link['href'] for link in response_dict['links'] if link['rel'].lower() == 'child']
+                )
+        if self._node_cache:
+            self._node_cache.set(url, entry)
+        return entry, False
+
+    def _traverse_stac(self, url: str, url_dict: Dict) -> Dict:
+        """
+        Threaded EE STAC tree traversal that returns the `url_dict` i.e. a dict with image/collection IDs/names as
+        keys, and the corresponding json STAC URLs as values.
+
+        Nodes are read by a fixed size thread pool, from a queue of pending nodes that is fed with the children of
+        each node as it is read.  Leaf nodes of unchanged catalog nodes are not requested.
+        """
+        with ThreadPoolExecutor(max_workers=self._max_crawl_threads) as executor:
+            futures = {executor.submit(self._read_stac_node, url): url}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_url = futures.pop(future)
+                    entry, unchanged = future.result()
+                    if not entry:
+                        continue
+                    if entry['leaf']:
+                        if entry['id']:
+                            url_dict[entry['id']] = node_url
+                            logger.debug(f'ID: {entry["id"]}, URL: {node_url}')
+                    else:
+                        for child_url in entry['children']:
+                            futures[executor.submit(self._read_stac_node, child_url, unchanged)] = child_url
         return url_dict
 
     def refresh_url_dict(self):
@@ -177,8 +270,7 @@ class StacCatalog:
         """ Write the ``url_dict`` to file. """
         if filename is None:
             filename = self._filename
-        with open(filename, 'w') as f:
-            json.dump(self.url_dict, f)
+        _write_json(filename, self.url_dict)
 
     def get_item_dict(self, name: str):
         """
@@ -198,15 +290,67 @@ class StacCatalog:
         if coll_name in self.url_dict:
             name = coll_name
 
-        # store item dicts in a cache so we don't have to request them more than once
-        if name not in self._cache:
-            if name not in self.url_dict:
-                logger.warning(f'There is no STAC entry for: {name}')
-                self._cache[name] = None
-            else:
-                response = self._session.get(self.url_dict[name])
-                self._cache[name] = response.json()
-        return self._cache[name]
+        # store item dicts in a memory cache so we don't have to request them more than once, and serialise the
+        # check-then-fetch per name so that concurrent callers share a single request
+        with self._get_name_lock(name):
+            if name not in self._cache:
+                if name not in self.url_dict:
+                    logger.warning(f'There is no STAC entry for: {name}')
+                    self._cache[name] = None
+                else:
+                    item_dict = self._fetch_item_dict(name, self.url_dict[name])
+                    if item_dict is None:
+                        # don't memoise fetch failures, so that they are retried on the next call
+                        return None
+                    self._cache[name] = item_dict
+            return self._cache[name]
+
+    def _get_name_lock(self, name: str) -> threading.Lock:
+        """ Return the lock that serialises STAC fetches for the image/collection `name`. """
+        with self._lock:
+            return self._name_locks.setdefault(name, threading.Lock())
+
+    def _fetch_item_dict(self, name: str, url: str) -> Union[Dict, None]:
+        """
+        Return the raw STAC dict for `name` from the disk cache (if enabled), revalidating it with the server (using
+        ETag / Last-Modified conditional requests) if it is older than ``_revalidate_interval``.  The STAC dict is
+        requested in full if it is not in the disk cache.  Returns None if the STAC dict could not be retrieved.
+        """
+        entry = self._disk_cache.get(name) if self._disk_cache else None
+        if entry and (entry['url'] == url) and (time.time() - entry['checked'] < self._revalidate_interval):
+            return entry['item_dict']
+
+        headers = {}
+        if entry and (entry['url'] == url):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self._session.get(url, headers=headers)
+        except requests.exceptions.RequestException as ex:
+            logger.debug(f'Error reading {url}: {str(ex)}')
+            response = None
+
+        if headers and (response is not None) and (response.status_code == 304):
+            entry.update(checked=time.time())
+        elif (response is not None) and response.ok:
+            entry = dict(
+                url=url, etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'),
+                checked=time.time(), item_dict=response.json()
+            )
+        elif entry:
+            # use the stale STAC dict rather than nothing
+            logger.debug(f'Could not revalidate STAC for {name}, using the cached version.')
+            return entry['item_dict']
+        else:
+            logger.warning(f'Could not retrieve STAC for {name} from {url}')
+            return None
+
+        if self._disk_cache:
+            self._disk_cache.set(name, entry)
+        return entry['item_dict']
 
     def get_item(self, name: str) -> StacItem:
         """
@@ -225,5 +369,11 @@ class StacCatalog:
         coll_name = utils.split_id(name)[0]
         if coll_name in self.url_dict:
             name = coll_name
-        item_dict = self.get_item_dict(name)
-        return StacItem(name, item_dict) if item_dict else None
+        # memoise the StacItem so band properties etc. are parsed once per image/collection
+        if name not in self._items:
+            item_dict = self.get_item_dict(name)
+            if not item_dict:
+                return None
+            with self._lock:
+                self._items.setdefault(name, StacItem(name, item_dict))
+        return self._items[name]
@@ -17,6 +17,7 @@
 import zipfile
 from io import BytesIO
 import threading
+from typing import Tuple, List
 
 import numpy as np
 import requests
@@ -27,13 +28,18 @@ from tqdm.auto import tqdm
 
 
 class Tile:
+    # Tiles are lightweight views into a tile plan, so avoid per-instance __dict__ and derive the transform and shape
+    # on demand.
+    __slots__ = ['_exp_image', '_window', '_bands']
+
     # lock to prevent concurrent calls to ee.Image.getDownloadURL(), which can cause a seg fault in the standard
     # python networking libraries.
     _ee_lock = threading.Lock()
 
-    def __init__(self, exp_image, window: Window):
+    def __init__(self, exp_image, window: Window, bands: Tuple[int, int] = None):
         """
-        Class for downloading an Earth Engine image tile (a rectangular region of interest in the image).
+        Class for downloading an Earth Engine image tile (a rectangular region of interest in the image, and
+        optionally a group of its bands).
 
         Parameters
         ----------
@@ -41,31 +47,64 @@ class Tile:
             BaseImage instance to derive the tile from.
         window: Window
             rasterio window into `exp_image`, specifying the region of interest for this tile.
+        bands: Tuple[int, int], optional
+            (offset, count) of the group of `exp_image` bands to include in this tile.  Defaults to all bands.
         """
         self._exp_image = exp_image
         self._window = window
-        # offset the image geo-transform origin so that it corresponds to the UL corner of the tile.
-        self._transform = exp_image.transform * Affine.translation(window.col_off, window.row_off)
-        self._shape = (window.height, window.width)
+        self._bands = bands
 
     @property
     def window(self) -> Window:
         """ rasterio tile window into the source image. """
         return self._window
 
-    def _get_download_url_response(self, session=None):
-        """ Get tile download url and response. """
+    @property
+    def indexes(self) -> List[int]:
+        """ 1-based indexes of the tile bands in the source image. """
+        band_off, count = self._bands or (0, self._exp_image.count)
+        return list(range(band_off + 1, band_off + count + 1))
+
+    @property
+    def _count(self) -> int:
+        """ Number of tile bands. """
+        return self._bands[1] if self._bands else self._exp_image.count
+
+    @property
+    def _transform(self) -> Affine:
+        """ Tile geo-transform. """
+        # offset the image geo-transform origin so that it corresponds to the UL corner of the tile.
+        return self._exp_image.transform * Affine.translation(self._window.col_off, self._window.row_off)
+
+    @property
+    def _shape(self):
+        """ (row, column) tile shape. """
+        return (self._window.height, self._window.width)
+
+    def _get_download_url_response(self, session=None, stop_event: threading.Event = None):
+        """
+        Get tile download url and response.  Returns (None, None) if `stop_event` is set before the url or response
+        is requested.
+        """
         session = session if session else requests
+        ee_image = self._exp_image.ee_image
+        if self._bands:
+            ee_image = ee_image.select(list(range(self._bands[0], self._bands[0] + self._bands[1])))
         with self._ee_lock:
-            url = self._exp_image.ee_image.getDownloadURL(
+            # the download may have been stopped while waiting for the lock
+            if stop_event is not None and stop_event.is_set():
+                return None, None
+            url = ee_image.getDownloadURL(
                 dict(
                     crs=self._exp_image.crs, crs_transform=tuple(self._transform)[:6], dimensions=self._shape[::-1],
                     filePerBand=False, fileFormat='GeoTIFF'
                 )
             )
+        if stop_event is not None and stop_event.is_set():
+            return None, None
         return session.get(url, stream=True), url
 
-    def download(self, session=None, response=None, bar: tqdm = None):
+    def download(self, session=None, response=None, bar: tqdm = None, stop_event: threading.Event = None):
         """
         Download the image tile into a numpy array.
 
@@ -77,25 +116,36 @@ class Tile:
             Response to a get request on the tile download url.
         bar: tqdm, optional
             tqdm propgress bar instance to update with incremental (0-1) download progress.
+        stop_event: threading.Event, optional
+            Event that signals the download to stop.  When set, the tile download url is not requested, or an
+            in-progress download is abandoned.
 
         Returns
         -------
         array: numpy.ndarray
-            3D numpy array of the tile pixel data with bands down the first dimension.
+            3D numpy array of the tile pixel data with bands down the first dimension.  None if the download was
+            stopped with ``stop_event``.
         """
 
+        def stopped() -> bool:
+            return stop_event is not None and stop_event.is_set()
+
         # get image download url and response
         if response is None:
-            response, url = self._get_download_url_response(session=session)
+            if stopped():
+                return None
+            response, url = self._get_download_url_response(session=session, stop_event=stop_event)
+            if response is None:
+                return None
 
         # find raw and actual download sizes
         dtype_size = np.dtype(self._exp_image.dtype).itemsize
-        raw_download_size = self._shape[0] * self._shape[1] * self._exp_image.count * dtype_size
+        raw_download_size = self._shape[0] * self._shape[1] * self._count * dtype_size
         download_size = int(response.headers.get('content-length', 0))
 
         if download_size == 0 or not response.ok:
             err_str = (
-                f'Tile shape: {self._shape}, count: {self._exp_image.count}, dtype: {self._exp_image.dtype}, '
+                f'Tile shape: {self._shape}, count: {self._count}, dtype: {self._exp_image.dtype}, '
                 f'size: {raw_download_size} Bytes.\n'
             )
             raise IOError(err_str + str(response.content))
@@ -103,6 +153,9 @@ class Tile:
         # download zip into buffer
         zip_buffer = BytesIO()
         for data in response.iter_content(chunk_size=10240):
+            if stopped():
+                response.close()
+                return None
             zip_buffer.write(data)
             if bar is not None:
                 # update with raw download progress (0-1)
@@ -0,0 +1,81 @@
+"""
+    Copyright 2021 Dugal Harris - dugalh@gmail.com
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import pathlib
+import time
+
+import pytest
+from geedim.cache import cache_dir, DiskCache
+
+
+@pytest.fixture
+def tmp_cache_dir(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    """ A temporary geedim cache directory. """
+    monkeypatch.setenv('GEEDIM_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_cache_dir(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    """ Test cache_dir() respects GEEDIM_CACHE_DIR and XDG_CACHE_HOME. """
+    monkeypatch.delenv('GEEDIM_CACHE_DIR', raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert cache_dir() == tmp_path.joinpath('geedim')
+    monkeypatch.setenv('GEEDIM_CACHE_DIR', str(tmp_path.joinpath('other')))
+    assert cache_dir() == tmp_path.joinpath('other')
+
+
+def test_get_set(tmp_cache_dir: pathlib.Path):
+    """ Test DiskCache get, set, delete and clear. """
+    cache = DiskCache('test')
+    assert cache.get('a') is None
+    assert cache.get('a', default=1) == 1
+    cache.set('a', dict(b=[1, 2]))
+    cache.set('c', 'd')
+    assert cache.filename.parent == tmp_cache_dir
+    assert DiskCache('test').get('a') == dict(b=[1, 2])  # test persistence with a new instance
+    cache.delete('a')
+    assert cache.get('a') is None
+    cache.clear()
+    assert cache.get('c') is None
+
+
+def test_ttl(tmp_cache_dir: pathlib.Path):
+    """ Test DiskCache items expire. """
+    cache = DiskCache('test', ttl=0.1)
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    time.sleep(0.2)
+    assert cache.get('a') is None
+    assert cache.get('a', ttl=10) == 1
+
+
+def test_max_items(tmp_cache_dir: pathlib.Path):
+    """ Test DiskCache keeps no more than `max_items`, removing the oldest. """
+    cache = DiskCache('test', max_items=2)
+    for i in range(3):
+        cache.set(str(i), i)
+        time.sleep(0.01)
+    assert cache.get('0') is None
+    assert [cache.get(str(i)) for i in range(1, 3)] == [1, 2]
+
+
+def test_errors(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    """ Test DiskCache treats an inaccessible cache directory as a miss, without raising errors. """
+    cache_file = tmp_path.joinpath('file')
+    cache_file.touch()
+    monkeypatch.setenv('GEEDIM_CACHE_DIR', str(cache_file))  # a file, not a directory
+    cache = DiskCache('test')
+    cache.set('a', 1)
+    assert cache.get('a') is None
@@ -15,6 +15,8 @@
 """
 import json
 import pathlib
+import subprocess
+import sys
 from datetime import datetime
 from glob import glob
 from typing import List, Dict
@@ -171,6 +173,22 @@ def test_search(
     assert np.all(sorted(im_dates) == im_dates)
 
 
+def test_search_page_size(region_100ha_file: pathlib.Path, tmp_path: pathlib.Path, runner: CliRunner):
+    """ Test search --page-size gives the same results as a single page search. """
+    results = []
+    for page_size in [1, 500]:
+        results_file = tmp_path.joinpath(f'search_results_{page_size}.json')
+        cli_str = (
+            f'search -c l9-c2-l2 -s 2022-01-01 -e 2022-02-01 -r {region_100ha_file} -ps {page_size} -op {results_file}'
+        )
+        result = runner.invoke(cli, cli_str.split())
+        assert (result.exit_code == 0)
+        with open(results_file, 'r') as f:
+            results.append(json.load(f))
+    assert len(results[0]) > 1
+    assert list(results[0].items()) == list(results[1].items())
+
+
 def test_config_search_s2(region_10000ha_file: pathlib.Path, runner: CliRunner, tmp_path: pathlib.Path):
     """ Test `config` sub-command chained with `search` of Sentinel-2 affects CLOUDLESS_PORTION as expected. """
     results_file = tmp_path.joinpath('search_results.json')
@@ -359,6 +377,25 @@ def test_download_params(
     _test_downloaded_file(out_file, region=region, crs=crs, scale=scale, dtype=dtype, scale_offset=scale_offset)
 
 
+def test_download_dry_run(
+    s2_sr_image_id: str, region_100ha_file: pathlib.Path, tmp_path: pathlib.Path, runner: CliRunner
+):
+    """ Test image download with --dry-run prints a JSON plan, and does not download.  """
+    cli_str = f'download -i {s2_sr_image_id} -r {region_100ha_file} -dd {tmp_path} -mts 1 --dry-run'
+    result = runner.invoke(cli, cli_str.split())
+    assert (result.exit_code == 0)
+    assert len(list(tmp_path.glob('*.tif'))) == 0
+
+    plans = json.loads(result.output)
+    assert len(plans) == 1
+    plan = plans[0]
+    assert plan['id'] == s2_sr_image_id
+    assert plan['num_tiles'] == len(plan['tiles']) > 1
+    assert plan['num_requests'] == 2 * plan['num_tiles']
+    assert 0 < plan['est_size'] <= plan['raw_size']
+    assert plan['est_time'] > 0
+
+
 def test_max_tile_size_error(
     s2_sr_image_id: str, region_100ha_file: pathlib.Path, tmp_path: pathlib.Path, runner: CliRunner, request
 ):
@@ -491,3 +528,21 @@ def test_search_composite_x2_download(region_25ha_file, runner: CliRunner, tmp_p
     with open(region_25ha_file) as f:
         region = json.load(f)
     _test_downloaded_file(out_files[0], region=region, crs='EPSG:3857', scale=30)
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason='`-X importtime` and lazy module __getattr__ require Python 3.7 or later.'
+)
+@pytest.mark.parametrize('command', ['import geedim', 'import geedim.cli', 'from geedim.cli import cli; cli(["--help"])'])
+def test_lazy_import(command: str):
+    """ Test importing geedim and the CLI, and displaying CLI help, do not import heavy dependencies. """
+    # `-X importtime` reports the import time of each module on stderr
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', command], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, cwd=root_path
+    )
+    assert result.returncode == 0, result.stderr
+    imported = [line.split('|')[-1].strip() for line in result.stderr.splitlines() if line.startswith('import time')]
+    assert 'geedim' in imported
+    for module in ['ee', 'rasterio', 'numpy', 'tqdm', 'tabulate']:
+        assert module not in imported
@@ -13,14 +13,16 @@
     See the License for the specific language governing permissions and
     limitations under the License.
 """
-from datetime import datetime
+import pathlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from typing import List, Union, Dict
 
 import ee
 import numpy as np
 import pytest
-from geedim import schema
-from geedim.collection import MaskedCollection
+from geedim import collection, schema
+from geedim.collection import MaskedCollection, parse_date, split_filter_expression
 from geedim.enums import CompositeMethod, ResamplingMethod
 from geedim.errors import UnfilteredError, InputImageError
 from geedim.mask import MaskedImage
@@ -164,6 +166,32 @@ def test_from_list(image_list: str, request):
     assert gd_collection.schema_table is not None
 
 
+def test_properties_missing(s2_sr_image_list: List):
+    """ Test MaskedCollection.properties omits image properties that don't exist, and keeps the collection order. """
+    image_ids = [im if isinstance(im, str) else im.id for im in s2_sr_image_list]
+    image_list = [ee.Image(image_ids[0]).set('TEST_PROP', 1), *image_ids[1:]]
+    gd_collection = MaskedCollection.from_list(image_list, add_props=['TEST_PROP'])
+    properties = gd_collection.properties
+    assert list(properties.keys()) == image_ids
+    assert properties[image_ids[0]]['TEST_PROP'] == 1
+    assert all(['TEST_PROP' not in im_props for im_props in list(properties.values())[1:]])
+    assert all(['system:time_start' in im_props for im_props in properties.values()])
+
+
+@pytest.mark.parametrize('page_size', [1, 2, 500])
+def test_iter_properties(s2_sr_image_list: List, page_size: int):
+    """ Test MaskedCollection.iter_properties() yields pages of properties in collection order. """
+    gd_collection = MaskedCollection.from_list(s2_sr_image_list)
+    pages = list(gd_collection.iter_properties(page_size=page_size))
+    assert all([len(page) <= page_size for page in pages])
+    assert len(pages) == -(-len(s2_sr_image_list) // page_size)
+    properties = OrderedDict(item for page in pages for item in page.items())
+    # properties should be cached after iterating, and match the pages
+    assert gd_collection._properties == properties
+    assert list(gd_collection.properties.keys()) == [im if isinstance(im, str) else im.id for im in s2_sr_image_list]
+    assert list(gd_collection.iter_properties(page_size=page_size)) == pages
+
+
 @pytest.mark.parametrize('image_list', ['s2_sr_image_list', 'gedi_image_list'])
 def test_from_list_order(image_list: str, request):
     """ Test MaskedCollection.from_list() maintains the order of the provided image list. """
@@ -271,6 +299,234 @@ def test_search_no_end_date(region_100ha):
     assert np.all(im_dates >= start_date) and np.all(im_dates < end_date)
 
 
+@pytest.mark.parametrize('shard_days', [30, 'auto'])
+def test_search_shards(shard_days, region_100ha):
+    """ Test a sharded MaskedCollection.search() gives the same results as an unsharded search. """
+    gd_collection = MaskedCollection.from_name('COPERNICUS/S2_SR_HARMONIZED')
+    search_args = ('2022-01-01', '2022-04-01', region_100ha)
+    sharded_collection = gd_collection.search(*search_args, fill_portion=50, shard_days=shard_days)
+    if shard_days == 'auto':
+        # the date range is shorter than the automatic shard size
+        assert sharded_collection._shards is None
+    else:
+        assert len(sharded_collection._shards) == 3
+    unsharded_collection = gd_collection.search(*search_args, fill_portion=50)
+    assert len(sharded_collection.properties) > 0
+    assert list(sharded_collection.properties.items()) == list(unsharded_collection.properties.items())
+    # test the combined collection matches too
+    assert sharded_collection.ee_collection.aggregate_array('system:index').getInfo() == [
+        split_id(im_id)[1] for im_id in unsharded_collection.properties.keys()
+    ]
+
+
+def test_search_staged_stats(region_100ha):
+    """
+    Test a MaskedCollection.search() with `fill_portion`, which finds region stats in stages, gives the same results
+    as a single stage search, filtered on fill portion.
+    """
+    gd_collection = MaskedCollection.from_name('LANDSAT/LC09/C02/T1_L2')
+    search_args = ('2022-01-01', '2022-06-01', region_100ha)
+    staged_collection = gd_collection.search(*search_args, fill_portion=50, cloudless_portion=20)
+    single_collection = gd_collection.search(*search_args)
+
+    exp_properties = [
+        (im_id, im_props) for im_id, im_props in single_collection.properties.items()
+        if im_props['FILL_PORTION'] >= 50 and im_props['CLOUDLESS_PORTION'] >= 20
+    ]
+    assert len(staged_collection.properties) > 0
+    assert list(staged_collection.properties.items()) == exp_properties
+
+
+def test_search_sampled_stats(region_10000ha):
+    """ Test MaskedCollection.search() with a `sample_size` includes portion confidence intervals in the results. """
+    gd_collection = MaskedCollection.from_name('COPERNICUS/S2_SR_HARMONIZED')
+    filt_collection = gd_collection.search(
+        '2022-01-01', '2022-02-01', region_10000ha, fill_portion=50, cloudless_portion=20, sample_size=200
+    )
+    assert list(filt_collection.schema.keys())[2:6] == [
+        'FILL_PORTION', 'FILL_PORTION_CI', 'CLOUDLESS_PORTION', 'CLOUDLESS_PORTION_CI'
+    ]
+    assert len(filt_collection.properties) > 0
+    for im_props in filt_collection.properties.values():
+        assert im_props['FILL_PORTION'] >= 50 and im_props['CLOUDLESS_PORTION'] >= 20
+        assert im_props['FILL_PORTION_CI'] >= 0 and im_props['CLOUDLESS_PORTION_CI'] >= 0
+
+    for sample_size in [0, 1.5, True]:
+        with pytest.raises(ValueError):
+            gd_collection.search('2022-01-01', '2022-02-01', region_10000ha, sample_size=sample_size)
+
+
+def test_search_cache(region_100ha, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    """ Test MaskedCollection.enable_search_cache() caches search results between searches. """
+    monkeypatch.setenv('GEEDIM_CACHE_DIR', str(tmp_path))
+    MaskedCollection.enable_search_cache()
+    try:
+        gd_collection = MaskedCollection.from_name('LANDSAT/LC09/C02/T1_L2')
+        properties = gd_collection.search('2022-01-01', '2022-02-01', region_100ha, fill_portion=50).properties
+        assert len(properties) > 0
+
+        # test a repeat search gets properties from the cache, without calling getInfo()
+        def get_info(*args, **kwargs):
+            raise AssertionError('getInfo() called')
+
+        with monkeypatch.context() as m:
+            m.setattr(ee.ComputedObject, 'getInfo', get_info)
+            searched_collection = gd_collection.search('2022-01-01', '2022-02-01', region_100ha, fill_portion=50)
+            assert searched_collection._past_search
+            assert list(searched_collection.properties.items()) == list(properties.items())
+
+        # test a different search has a different cache key
+        other_collection = gd_collection.search('2022-01-01', '2022-02-01', region_100ha, fill_portion=99)
+        assert other_collection._get_search_cache_key() != searched_collection._get_search_cache_key()
+    finally:
+        MaskedCollection.enable_search_cache(False)
+
+
+@pytest.mark.parametrize(
+    'search_kwargs, subsumed', [
+        (dict(start_date='2022-01-10', end_date='2022-02-20'), True),
+        (dict(start_date=datetime(2022, 1, 10, tzinfo=timezone.utc), end_date=datetime(2022, 2, 20)), True),
+        (dict(fill_portion=80, cloudless_portion=60), True),
+        (dict(start_date='2021-12-01'), False),
+        (dict(fill_portion=10), False),
+        (dict(mask_shadows=False), False),
+        (dict(sample_size=100), False),
+    ]
+)  # yapf: disable
+def test_search_subsumed(search_kwargs: Dict, subsumed: bool, region_100ha):
+    """
+    Test MaskedCollection.search() answers searches contained in the last search on the client, and only these
+    searches.
+    """
+    base_kwargs = dict(start_date='2022-01-01', end_date='2022-03-01', region=region_100ha, fill_portion=50)
+    gd_collection = MaskedCollection.from_name('COPERNICUS/S2_SR_HARMONIZED')
+    properties = gd_collection.search(**base_kwargs).properties
+    assert len(properties) > 0
+
+    search_kwargs = {**base_kwargs, **search_kwargs}
+    searched_collection = gd_collection.search(**search_kwargs)
+    assert (searched_collection._properties is not None) == subsumed
+    if subsumed:
+        # test client filtered properties match the EE search properties
+        exp_properties = MaskedCollection.from_name('COPERNICUS/S2_SR_HARMONIZED').search(**search_kwargs).properties
+        assert list(searched_collection.properties.items()) == list(exp_properties.items())
+
+
+@pytest.mark.parametrize(
+    'name, scene_cloud_prop', [('LANDSAT/LC09/C02/T1_L2', 'CLOUD_COVER'), ('COPERNICUS/S2_SR', 'CLOUDY_PIXEL_PERCENTAGE')]
+)
+def test_search_max_cloud_cover(name: str, scene_cloud_prop: str, region_100ha):
+    """ Test MaskedCollection.search(max_cloud_cover=...) excludes images with scene cloud cover above the maximum. """
+    gd_collection = MaskedCollection.from_name(name, add_props=[scene_cloud_prop])
+    search_args = ('2022-01-01', '2022-04-01', region_100ha)
+    properties = gd_collection.search(*search_args).properties
+    scene_clouds = [im_props[scene_cloud_prop] for im_props in properties.values()]
+    max_cloud_cover = np.median(scene_clouds)
+    filt_properties = gd_collection.search(*search_args, max_cloud_cover=max_cloud_cover).properties
+    assert 0 < len(filt_properties) < len(properties)
+    assert list(filt_properties.keys()) == [
+        im_id for im_id, im_props in properties.items() if im_props[scene_cloud_prop] <= max_cloud_cover
+    ]
+
+
+def test_search_scene_filter(region_100ha, monkeypatch: pytest.MonkeyPatch):
+    """ Test MaskedCollection.search() applies the scene index filter, and gives the same results as without it. """
+    gd_collection = MaskedCollection.from_name('COPERNICUS/S2_SR_HARMONIZED')
+    search_args = ('2022-01-01', '2022-02-01', region_100ha)
+    properties = gd_collection.search(*search_args).properties
+    assert len(properties) > 0
+
+    # test the scene filter is found for the collection grid, and applied
+    grid_names = []
+
+    def get_scene_filter(grid_name, region):
+        grid_names.append(grid_name)
+        return ee.Filter.inList('MGRS_TILE', ['unknown'])
+
+    monkeypatch.setattr(collection, 'get_scene_filter', get_scene_filter)
+    assert len(MaskedCollection.from_name('COPERNICUS/S2_SR_HARMONIZED').search(*search_args).properties) == 0
+    assert grid_names == ['mgrs']
+
+    # test searching without the scene filter gives the same results
+    monkeypatch.setattr(collection, 'get_scene_filter', lambda grid_name, region: None)
+    exp_properties = MaskedCollection.from_name('COPERNICUS/S2_SR_HARMONIZED').search(*search_args).properties
+    assert list(properties.keys()) == list(exp_properties.keys())
+
+
+def test_get_property_columns():
+    """ Test MaskedCollection._get_property_columns() converts properties to typed columns. """
+    properties = OrderedDict([
+        ('A/1', {'system:id': 'A/1', 'system:time_start': 1640995200000, 'FILL': 99.5, 'INT': 3, 'STR': 'x'}),
+        ('A/2', {'system:id': 'A/2', 'INT': 4}),
+    ])  # yapf: disable
+    columns = MaskedCollection._get_property_columns(
+        properties, ['system:id', 'system:time_start', 'FILL', 'INT', 'STR', 'NONE']
+    )
+    assert list(columns.keys()) == ['system:id', 'system:time_start', 'FILL', 'INT', 'STR', 'NONE']
+    assert columns['system:id'].tolist() == ['A/1', 'A/2']
+    assert columns['system:time_start'].dtype == np.dtype('datetime64[ms]')
+    assert columns['system:time_start'][0] == np.datetime64('2022-01-01')
+    assert np.isnat(columns['system:time_start'][1])
+    assert columns['FILL'].dtype == np.float64 and np.isnan(columns['FILL'][1])
+    assert columns['INT'].dtype == np.int64
+    assert columns['STR'].tolist() == ['x', None]
+    assert columns['NONE'].tolist() == [None, None]
+
+
+def test_iter_properties_table():
+    """ Test MaskedCollection.iter_properties_table() formats pages as one table, with a single header. """
+    schema = {
+        'system:id': {'abbrev': 'ID'}, 'system:time_start': {'abbrev': 'DATE'}, 'FILL': {'abbrev': 'FILL'},
+        'NONE': {'abbrev': 'NONE'}
+    }  # yapf: disable
+    pages = [
+        OrderedDict([('A/1', {'system:id': 'A/1', 'system:time_start': 1640995200000, 'FILL': 99.5})]),
+        OrderedDict(),
+        OrderedDict([('A/22', {'system:id': 'A/22', 'FILL': 100.})]),
+    ]  # yapf: disable
+    gd_collection = MaskedCollection.__new__(MaskedCollection)
+    tables = list(gd_collection.iter_properties_table(pages, schema=schema))
+    assert tables == [
+        'ID  DATE              FILL\n'
+        '--- ---------------- -----\n'
+        'A/1 2022-01-01 00:00 99.50',
+        'A/22' + ' ' * 18 + '100.00',  # values longer than the first page's column widths overflow
+    ]
+
+
+def test_property_columns(s2_sr_image_list: List):
+    """ Test MaskedCollection.property_columns, to_pandas() and to_arrow() match MaskedCollection.properties. """
+    gd_collection = MaskedCollection.from_list(s2_sr_image_list)
+    properties = gd_collection.properties
+    columns = gd_collection.property_columns
+    assert list(columns.keys()) == list(gd_collection.schema.keys())
+    assert columns['system:id'].tolist() == list(properties.keys())
+    assert columns['FILL_PORTION'].tolist() == [im_props['FILL_PORTION'] for im_props in properties.values()]
+
+    pd = pytest.importorskip('pandas')
+    df = gd_collection.to_pandas()
+    assert df.index.tolist() == list(properties.keys())
+    assert pd.api.types.is_datetime64_any_dtype(df['system:time_start'])
+    assert df['FILL_PORTION'].tolist() == columns['FILL_PORTION'].tolist()
+
+    pytest.importorskip('pyarrow')
+    table = gd_collection.to_arrow()
+    assert table.column_names == list(columns.keys())
+    assert table.num_rows == len(properties)
+
+
+def test_shard_dates():
+    """ Test MaskedCollection._get_shard_dates() covers the date range. """
+    gd_collection = MaskedCollection.from_name('LANDSAT/LC09/C02/T1_L2')
+    start_date, end_date = datetime(2022, 1, 1), datetime(2022, 3, 1)
+    shard_dates = gd_collection._get_shard_dates(start_date, end_date, 20)
+    assert shard_dates == [start_date, datetime(2022, 1, 21), datetime(2022, 2, 10), end_date]
+    assert gd_collection._get_shard_dates(start_date, end_date, 'auto') == [start_date, end_date]
+    for shard_days in [0, -1, 1.5, True, False, 'unknown']:
+        with pytest.raises(ValueError):
+            gd_collection._get_shard_dates(start_date, end_date, shard_days)
+
+
 def test_search_date_error(region_100ha):
     """ Test MaskedCollection.search() raises an error when end date is on or before start date. """
     gd_collection = MaskedCollection.from_name('LANDSAT/LC09/C02/T1_L2')
@@ -315,6 +571,61 @@ def test_search_custom_filter(region_25ha):
     assert kwarg_coll.properties == cust_filt_coll.properties
 
 
+def test_search_custom_filter_pushdown(region_25ha):
+    """
+    Test that a custom filter combining image metadata and region stats terms gives the same search results as the
+    equivalent kwarg specification.
+    """
+    start_date = '2022-01-01'
+    end_date = '2022-04-01'
+    gd_collection = MaskedCollection.from_name('LANDSAT/LC09/C02/T1_L2', add_props=['CLOUD_COVER'])
+    kwarg_coll = gd_collection.search(start_date, end_date, region_25ha, cloudless_portion=50, max_cloud_cover=50)
+    cust_filt_coll = gd_collection.search(
+        start_date, end_date, region_25ha, custom_filter='CLOUD_COVER <= 50 && (CLOUDLESS_PORTION>=50)'
+    )
+    assert (kwarg_coll.properties is not None) and (len(kwarg_coll.properties) > 0)
+    assert kwarg_coll.properties == cust_filt_coll.properties
+
+
+@pytest.mark.parametrize(
+    'expression, exp_terms', [
+        ('CLOUD_COVER<50', ['CLOUD_COVER<50']),
+        ('CLOUD_COVER<50 && FILL_PORTION>50', ['CLOUD_COVER<50', 'FILL_PORTION>50']),
+        ('A<1 && (B>2 || C<3) && D=="x&&y"', ['A<1', '(B>2 || C<3)', 'D=="x&&y"']),
+        ('A<1 || B>2 && C<3', ['A<1 || B>2 && C<3']),
+        ('(A<1 && B>2) || C<3', ['(A<1 && B>2) || C<3']),
+        ('A<1 && B>2 or C<3', ['A<1 && B>2 or C<3']),
+        ("D == 'or' && B>1", ["D == 'or'", 'B>1']),
+    ]
+)  # yapf: disable
+def test_split_filter_expression(expression: str, exp_terms: List[str]):
+    """ Test split_filter_expression() splits top level conjunctions only. """
+    assert split_filter_expression(expression) == exp_terms
+
+
+@pytest.mark.parametrize(
+    'date, exp_date', [
+        ('2022-01-01', datetime(2022, 1, 1)),
+        (datetime(2022, 1, 1, 12), datetime(2022, 1, 1, 12)),
+        (datetime(2022, 1, 1, 12, tzinfo=timezone.utc), datetime(2022, 1, 1, 12)),
+        (datetime(2022, 1, 1, 12, tzinfo=timezone(timedelta(hours=2))), datetime(2022, 1, 1, 10)),
+    ]
+)  # yapf: disable
+def test_parse_date(date: Union[str, datetime], exp_date: datetime):
+    """ Test parse_date() returns naive UTC datetimes. """
+    assert parse_date(date) == exp_date
+
+
+def test_search_aware_dates(region_100ha):
+    """ Test MaskedCollection.search() accepts timezone aware dates, and mixed aware and naive dates. """
+    gd_collection = MaskedCollection.from_name('LANDSAT/LC09/C02/T1_L2')
+    start_date = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    searched_collection = gd_collection.search(start_date, datetime(2022, 2, 1), region_100ha)
+    assert searched_collection._past_search is None  # the search cache is disabled
+    exp_properties = gd_collection.search('2022-01-01', '2022-02-01', region_100ha).properties
+    assert list(searched_collection.properties.keys()) == list(exp_properties.keys())
+
+
 def test_search_add_props(region_25ha):
     """
     Test that specified add_props are added to the search results.
@@ -92,6 +92,55 @@ def test_id_name(user_base_image: BaseImage, s2_sr_base_image: BaseImage):
     assert s2_sr_base_image.name == s2_sr_base_image.id.replace('/', '-')
 
 
+def test_prefetch_info(s2_sr_image_id: str, l9_image_id: str, user_base_image: BaseImage):
+    """ Test BaseImage.prefetch_info() fetches and caches metadata for several images, in chunks. """
+    images = [BaseImage.from_id(s2_sr_image_id), BaseImage.from_id(l9_image_id), BaseImage(user_base_image.ee_image)]
+    BaseImage.prefetch_info(images, chunk_size=2)
+    for image in images:
+        assert image._BaseImage__ee_info is not None
+        assert image._ee_info == image.ee_image.getInfo()
+    assert images[0].id == s2_sr_image_id
+    assert images[1].crs is not None
+
+
+def test_prefetch_info_error(s2_sr_image_id: str, l9_image_id: str):
+    """ Test BaseImage.prefetch_info() fetches the valid images in a chunk that contains an invalid image. """
+    images = [BaseImage.from_id(s2_sr_image_id), BaseImage.from_id('unknown/image'), BaseImage.from_id(l9_image_id)]
+    BaseImage.prefetch_info(images, chunk_size=3)
+    assert images[0]._BaseImage__ee_info is not None
+    assert images[1]._BaseImage__ee_info is None
+    assert images[2]._BaseImage__ee_info is not None
+    with pytest.raises(ee.EEException):
+        images[1].crs
+
+
+def test_info_cache(s2_sr_image_id: str, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    """ Test BaseImage.enable_info_cache() caches image metadata between instances, and prefetch_info() uses it. """
+    monkeypatch.setenv('GEEDIM_CACHE_DIR', str(tmp_path))
+    BaseImage.enable_info_cache()
+    try:
+        ee_info = BaseImage.from_id(s2_sr_image_id)._ee_info
+
+        # test new instances get metadata from the cache, without calling getInfo()
+        def get_info(*args, **kwargs):
+            raise AssertionError('getInfo() called')
+
+        with monkeypatch.context() as m:
+            m.setattr(ee.Image, 'getInfo', get_info)
+            m.setattr(ee.List, 'getInfo', get_info)
+            assert BaseImage.from_id(s2_sr_image_id)._ee_info == ee_info
+            image = BaseImage.from_id(s2_sr_image_id)
+            BaseImage.prefetch_info([image])
+            assert image._BaseImage__ee_info == ee_info
+
+        # test a different expression on the same image is not a cache hit
+        image = BaseImage(ee.Image(s2_sr_image_id).select(0))
+        image._id = s2_sr_image_id
+        assert image._ee_info != ee_info
+    finally:
+        BaseImage.enable_info_cache(False)
+
+
 def test_user_props(user_base_image: BaseImage):
     """ Test non fixed projection image properties (other than id and has_fixed_projection). """
     assert user_base_image.crs is None
@@ -257,6 +306,26 @@ def test_prepare_for_export(src_image: str, tgt_image: str, request: pytest.Fixt
     )
 
 
+@pytest.mark.parametrize('src_image', ['s2_sr_base_image', 'l9_base_image'])
+def test_prepare_for_export_grid(src_image: str, region_25ha: Dict, request: pytest.FixtureRequest):
+    """ Test BaseImage._prepare_for_export() keeps the source pixel grid when the CRS and scale are not changed.  """
+    src_image: BaseImage = request.getfixturevalue(src_image)
+    for kwargs in [dict(), dict(crs=src_image.crs, scale=src_image.scale)]:
+        exp_image = src_image._prepare_for_export(region=region_25ha, **kwargs)
+        assert exp_image.crs == src_image.crs
+        assert exp_image.scale == src_image.scale
+        # test the export image origin is a whole number of source pixels from the source origin
+        offset = ~src_image.transform * (exp_image.transform.xoff, exp_image.transform.yoff)
+        assert offset == pytest.approx(np.round(offset), abs=1e-6)
+
+        # test the export image bounds contain the region
+        exp_region = transform_geom(exp_image.footprint['crs']['properties']['name'], 'EPSG:4326', exp_image.footprint)
+        exp_bounds = bounds(exp_region)
+        region_bounds = bounds(region_25ha)
+        assert (exp_bounds[0] <= region_bounds[0]) and (exp_bounds[1] <= region_bounds[1])
+        assert (exp_bounds[2] >= region_bounds[2]) and (exp_bounds[3] >= region_bounds[3])
+
+
 @pytest.mark.parametrize(
     'src_image, tgt_image', [('s2_sr_base_image', 's2_sr_base_image'), ('user_base_image', 's2_sr_base_image'), ]
 )
@@ -380,6 +449,200 @@ def test_tiles(image_shape: Tuple, tile_shape: Tuple, image_transform: Affine):
     assert (accum_window.height, accum_window.width) == exp_image.shape
 
 
+@pytest.mark.parametrize(
+    'image_shape, tile_shape', [((1000, 500), (101, 101)), ((1000, 100), (101, 101)), ((303, 202), (101, 101))]
+)
+def test_tiles_largest_first(image_shape: Tuple, tile_shape: Tuple):
+    """ Test largest first tile ordering gives the same tiles as row-major ordering, in order of decreasing size. """
+    exp_image = BaseImageLike(shape=image_shape)
+    tiles = [tile for tile in BaseImage._tiles(exp_image, tile_shape=tile_shape, largest_first=True)]
+    row_major_tiles = [tile for tile in BaseImage._tiles(exp_image, tile_shape=tile_shape)]
+
+    tile_areas = [tile.window.height * tile.window.width for tile in tiles]
+    assert all(np.diff(tile_areas) <= 0)
+    assert sorted([tuple(tile.window.flatten()) for tile in tiles]) == sorted(
+        [tuple(tile.window.flatten()) for tile in row_major_tiles]
+    )
+
+
+@pytest.mark.parametrize(
+    'image_shape, max_tile_size, exp_num_tiles', [
+        ((1000, 1000), 4, 5), ((3000, 2000), 4, 29), ((20000, 100), 32, 2), ((25000, 25000), 32, 374),
+    ]
+)  # yapf: disable
+def test_tile_shape_num_tiles(image_shape: Tuple, max_tile_size: float, exp_num_tiles: int):
+    """ Test BaseImage._get_tile_shape() finds the minimum number of tiles. """
+    exp_image = BaseImageLike(shape=image_shape)
+    tile_shape, num_tiles = BaseImage._get_tile_shape(exp_image, max_tile_size=max_tile_size)
+    assert num_tiles == exp_num_tiles
+    assert num_tiles == np.prod(np.ceil(np.divide(image_shape, tile_shape)))
+    assert BaseImageLike(shape=tile_shape).size < (max_tile_size << 20)
+
+
+def test_tile_plan(tmp_path: pathlib.Path):
+    """ Test BaseImage._get_tile_plan() matches tiles, and can be saved and loaded. """
+    exp_image = BaseImageLike(shape=(1000, 500))
+    tile_shape = (101, 101)
+    plan = BaseImage._get_tile_plan(exp_image, tile_shape, largest_first=True)
+    assert plan.dtype.names == ('row_off', 'col_off', 'height', 'width', 'band_off', 'band_count')
+    assert len(plan) == 50
+    assert np.sum(plan['height'] * plan['width']) == np.prod(exp_image.shape)
+
+    plan_file = tmp_path.joinpath('plan.npy')
+    np.save(plan_file, plan)
+    loaded_plan = np.load(plan_file)
+    assert np.all(loaded_plan == plan)
+
+    tiles = [tile for tile in BaseImage._tiles(exp_image, plan=loaded_plan)]
+    exp_tiles = [tile for tile in BaseImage._tiles(exp_image, tile_shape=tile_shape, largest_first=True)]
+    assert [tile.window for tile in tiles] == [tile.window for tile in exp_tiles]
+    assert not hasattr(tiles[0], '__dict__')
+
+
+@pytest.mark.parametrize(
+    'image_shape, count, max_tile_size', [
+        ((1000, 1000), 100, 32), ((100, 100), 10000, 1), ((2, 2), 1000000, 1), ((3, 3), 10, 1),
+    ]
+)  # yapf: disable
+def test_tile_split(image_shape: Tuple, count: int, max_tile_size: float):
+    """ Test BaseImage._get_tile_split() satisfies the tile size limit, with no more tiles than a spatial split. """
+    exp_image = BaseImageLike(shape=image_shape, count=count)
+    tile_count, tile_shape, num_tiles = BaseImage._get_tile_split(exp_image, max_tile_size=max_tile_size)
+    spatial_tile_shape, spatial_num_tiles = BaseImage._get_tile_shape(exp_image, max_tile_size=max_tile_size)
+    assert BaseImageLike(shape=tile_shape, count=tile_count).size < (max_tile_size << 20)
+    if BaseImageLike(shape=spatial_tile_shape, count=count).size < (max_tile_size << 20):
+        # a spatial only split is possible, so the band split should not need more tiles
+        assert num_tiles <= spatial_num_tiles
+        if num_tiles == spatial_num_tiles:
+            assert tile_count == count
+    else:
+        assert tile_count < count
+
+    plan = BaseImage._get_tile_plan(exp_image, tile_shape, tile_count=tile_count, largest_first=True)
+    assert len(plan) == num_tiles
+    # test the plan covers all pixels of all bands
+    assert np.sum(plan['height'] * plan['width'] * plan['band_count']) == np.prod(image_shape) * count
+    tiles = list(BaseImage._tiles(exp_image, plan=plan))
+    assert all([len(tile.indexes) == tile_count or tile.indexes[-1] == count for tile in tiles])
+
+
+def test_learned_tile_size(user_base_image: BaseImage, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    """ Test recording tile size successes and failures gives a learned tile size below the failures. """
+    monkeypatch.setenv('GEEDIM_CACHE_DIR', str(tmp_path))
+    exp_image = BaseImageLike(shape=(1000, 1000), dtype='float32')
+    # test nothing is learned when the store is disabled (the default)
+    user_base_image._record_tile_size(exp_image, 30 << 20, success=False)
+    assert user_base_image._get_learned_tile_size(exp_image) is None
+    assert not tmp_path.joinpath('tile_limits.sqlite').exists()
+
+    monkeypatch.setattr(BaseImage, '_tile_limits', None)
+    BaseImage.enable_tile_limit_cache()
+    assert user_base_image._get_learned_tile_size(exp_image) is None
+
+    user_base_image._record_tile_size(exp_image, 10 << 20, success=True)
+    assert user_base_image._get_learned_tile_size(exp_image) is None
+    user_base_image._record_tile_size(exp_image, 30 << 20, success=False)
+    assert 15 < user_base_image._get_learned_tile_size(exp_image) < 30
+    user_base_image._record_tile_size(exp_image, 20 << 20, success=True)
+    assert 20 < user_base_image._get_learned_tile_size(exp_image) < 30
+
+    # test learned tile sizes are specific to the dtype
+    assert user_base_image._get_learned_tile_size(BaseImageLike(shape=(1000, 1000), dtype='uint8')) is None
+    # test learned tile sizes of images without IDs are specific to the image expression
+    assert BaseImage(ee.Image([1, 2]))._get_learned_tile_size(exp_image) is None
+
+
+@pytest.mark.parametrize(
+    'image_shape, grid_phase', [((5000, 7000), (0, 0)), ((5000, 7000), (100, 37)), ((300, 200), (10, 0))]
+)
+def test_aligned_tiles(image_shape: Tuple, grid_phase: Tuple):
+    """ Test BaseImage._get_aligned_tile_shape() and a grid offset tile plan give tiles aligned with asset tiles. """
+    exp_image = BaseImageLike(shape=image_shape, transform=Affine.translation(20, -30) * Affine.scale(1e-4, -1e-4))
+    exp_image.crs = 'EPSG:4326'
+    block_dim = BaseImage._ee_asset_tile_dim
+    tile_shape, num_tiles = BaseImage._get_aligned_tile_shape(exp_image, grid_phase)
+    assert all(np.mod(tile_shape, block_dim) == 0)
+    assert BaseImageLike(shape=tile_shape).size < (BaseImage._ee_max_tile_size << 20)
+
+    grid_offset = tuple((phase - dim) if phase > 0 else 0 for phase, dim in zip(grid_phase, tile_shape))
+    plan = BaseImage._get_tile_plan(exp_image, tile_shape, grid_offset=grid_offset)
+    assert len(plan) == num_tiles
+    assert np.sum(plan['height'] * plan['width']) == np.prod(image_shape)
+    assert all(plan['height'] <= tile_shape[0]) and all(plan['width'] <= tile_shape[1])
+    # test tile boundaries (other than at the image edges) lie on the asset tile grid
+    assert all(np.mod(plan['row_off'][plan['row_off'] > 0] - grid_phase[0], block_dim) == 0)
+    assert all(np.mod(plan['col_off'][plan['col_off'] > 0] - grid_phase[1], block_dim) == 0)
+
+    # test a tile mask of a geometry covering the image has one cell per tile
+    geom = dict(type='Polygon', coordinates=[[[20, -30], [21, -30], [21, -31], [20, -31], [20, -30]]])
+    tile_mask = BaseImage._get_tile_mask(exp_image, tile_shape, [geom], grid_offset=grid_offset)
+    assert tile_mask.size == tile_mask.sum() == num_tiles
+
+
+def test_tile_mask():
+    """ Test BaseImage._get_tile_mask() prunes tiles outside a geometry, and keeps tiles inside it. """
+    # 1000x1000 pixel EPSG:4326 image with 0.001 degree pixels, and a 10x10 tile grid
+    transform = Affine.translation(20, -30) * Affine.scale(0.001, -0.001)
+    exp_image = BaseImageLike(shape=(1000, 1000), transform=transform)
+    exp_image.crs = 'EPSG:4326'
+    tile_shape = (100, 100)
+    # triangle covering the upper left half of the image
+    geom = dict(type='Polygon', coordinates=[[[20, -30], [20.5, -30], [20, -30.5], [20, -30]]])
+
+    tile_mask = BaseImage._get_tile_mask(exp_image, tile_shape, [geom, None])
+    assert tile_mask.shape == (10, 10)
+    assert tile_mask[0, 0] and not tile_mask[-1, -1]
+    plan = BaseImage._get_tile_plan(exp_image, tile_shape, tile_mask=tile_mask)
+    assert len(plan) == tile_mask.sum() < 100
+    assert BaseImage._get_tile_mask(exp_image, tile_shape, [None]) is None
+
+
+def test_plan_download_prune(monkeypatch: pytest.MonkeyPatch):
+    """ Test BaseImage._plan_download() prunes tiles outside the image footprint only when asked to. """
+    transform = Affine.translation(20, -30) * Affine.scale(0.001, -0.001)
+    exp_image = BaseImageLike(shape=(1000, 1000), count=1, dtype='uint8', transform=transform)
+    exp_image.crs = 'EPSG:4326'
+    exp_image.footprint = dict(type='Polygon', coordinates=[[[20, -30], [20.5, -30], [20, -30.5], [20, -30]]])
+    # emulate a BaseImage without EE calls
+    base_image = BaseImage.__new__(BaseImage)
+    monkeypatch.setattr(base_image, '_prepare_for_download', lambda **kwargs: (exp_image, {}))
+    monkeypatch.setattr(base_image, '_get_learned_tile_size', lambda exp_image: None)
+    monkeypatch.setattr(base_image, '_get_source_grid_offset', lambda exp_image: None)
+
+    # the default (as used by download()) downloads all tiles
+    _, _, tile_plan, plan_info = base_image._plan_download(max_tile_dim=100)
+    assert len(tile_plan) == 100
+    assert plan_info['num_pruned_tiles'] == 0
+    assert np.sum(tile_plan['height'] * tile_plan['width']) == np.prod(exp_image.shape)
+
+    _, _, pruned_plan, pruned_info = base_image._plan_download(max_tile_dim=100, prune_tiles=True)
+    assert 0 < len(pruned_plan) < 100
+    assert len(pruned_plan) + pruned_info['num_pruned_tiles'] == 100
+
+    # the download region is not used for pruning, as EE clips downloads to the region bounds only
+    region = dict(type='Polygon', coordinates=[[[20.5, -30.5], [21, -30.5], [21, -31], [20.5, -30.5]]])
+    _, _, region_plan, _ = base_image._plan_download(max_tile_dim=100, prune_tiles=True, region=region)
+    assert len(region_plan) == len(pruned_plan)
+
+
+def test_plan_download_align(monkeypatch: pytest.MonkeyPatch):
+    """ Test BaseImage._plan_download() aligns tiles with asset tiles only when asked to. """
+    exp_image = BaseImageLike(shape=(1000, 1000), count=1, dtype='uint8')
+    base_image = BaseImage.__new__(BaseImage)
+    monkeypatch.setattr(base_image, '_prepare_for_download', lambda **kwargs: (exp_image, {}))
+    monkeypatch.setattr(base_image, '_get_learned_tile_size', lambda exp_image: None)
+    # emulate a download on the source grid, offset from the source origin
+    monkeypatch.setattr(base_image, '_get_source_grid_offset', lambda exp_image: (100, 100))
+    # allow any increase in the number of tiles, so that the aligned tile shape is used
+    monkeypatch.setattr(base_image, '_max_aligned_tile_increase', 10)
+
+    _, _, _, plan_info = base_image._plan_download(max_tile_dim=500)
+    assert plan_info['grid_offset'] == (0, 0)
+    _, _, tile_plan, plan_info = base_image._plan_download(max_tile_dim=500, align_tiles=True)
+    assert plan_info['grid_offset'] != (0, 0)
+    assert np.sum(tile_plan['height'] * tile_plan['width']) == np.prod(exp_image.shape)
+
+
 @pytest.mark.parametrize(
     'base_image, region', [
         ('user_base_image', 'region_25ha'),
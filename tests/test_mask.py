@@ -87,6 +87,35 @@ def test_set_region_stats(masked_image: str, region_100ha, request: pytest.Fixtu
     assert masked_image.properties['CLOUDLESS_PORTION'] <= masked_image.properties['FILL_PORTION']
 
 
+@pytest.mark.parametrize('masked_image', ['s2_sr_hm_masked_image', 'l9_masked_image', 'user_masked_image'])
+def test_set_region_stats_staged(masked_image: str, region_100ha, request: pytest.FixtureRequest):
+    """ Test MaskedImage._set_region_stats() finds the same stats when they are set one at a time, as together. """
+    masked_image: MaskedImage = request.getfixturevalue(masked_image)
+    masked_image._set_region_stats(region_100ha)
+    stats = {k: masked_image.properties[k] for k in ['FILL_PORTION', 'CLOUDLESS_PORTION']}
+
+    masked_image._set_region_stats(region_100ha, cloudless=False)
+    assert masked_image.properties['FILL_PORTION'] == pytest.approx(stats['FILL_PORTION'], abs=1e-6)
+    masked_image._set_region_stats(region_100ha, fill=False)
+    for stat_name, stat_value in stats.items():
+        assert masked_image.properties[stat_name] == pytest.approx(stat_value, abs=1e-6)
+
+
+@pytest.mark.parametrize('masked_image', ['s2_sr_hm_masked_image', 'l9_masked_image', 'user_masked_image'])
+def test_set_region_stats_sampled(masked_image: str, region_10000ha, request: pytest.FixtureRequest):
+    """ Test MaskedImage._set_region_stats() with a `sample_size` estimates the exact stats. """
+    masked_image: MaskedImage = request.getfixturevalue(masked_image)
+    masked_image._set_region_stats(region_10000ha)
+    stats = {k: masked_image.properties[k] for k in ['FILL_PORTION', 'CLOUDLESS_PORTION']}
+
+    masked_image._set_region_stats(region_10000ha, sample_size=500)
+    for stat_name, stat_value in stats.items():
+        ci = masked_image.properties[stat_name + '_CI']
+        assert 0 < ci <= 100 * 1.96 * 0.5 / np.sqrt(100)
+        # allow for the ~5% chance the exact value is outside the 95% confidence interval
+        assert masked_image.properties[stat_name] == pytest.approx(stat_value, abs=2 * ci + 1)
+
+
 @pytest.mark.parametrize('image_id', ['l9_image_id', 'l8_image_id', 'l7_image_id', 'l5_image_id', 'l4_image_id'])
 def test_landsat_cloudless_portion(image_id: str, request: pytest.FixtureRequest):
     """ Test `geedim` CLOUDLESS_PORTION for the whole image against related Landsat CLOUD_COVER property. """
@@ -0,0 +1,108 @@
+"""
+    Copyright 2021 Dugal Harris - dugalh@gmail.com
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+from typing import Dict, List
+
+import ee
+import pytest
+from geedim import scene_index
+
+
+def _box(xmin: float, ymin: float, xmax: float, ymax: float) -> Dict:
+    """ Return a geojson polygon of the given bounds. """
+    coords = [[xmin, ymin], [xmax, ymin], [xmax, ymax], [xmin, ymax], [xmin, ymin]]
+    return dict(type='Polygon', coordinates=[coords])
+
+
+@pytest.mark.parametrize(
+    'region, exp_tiles', [
+        # Paris, Cape Town and New York
+        (_box(2.3, 48.8, 2.4, 48.9), ['31UDQ']),
+        (_box(18.4, -33.95, 18.45, -33.9), ['34HBH']),
+        (_box(-74.05, 40.7, -74., 40.75), ['18TWL']),
+        # either side of the antimeridian
+        (_box(179.9, -72.5, 179.95, -72.45), ['01CCV']),
+        (_box(-179.95, -72.5, -179.9, -72.45), ['01CCV']),
+        # Svalbard zone exception
+        (_box(15.6, 78.2, 15.7, 78.25), ['33XWG']),
+    ]
+)  # yapf: disable
+def test_get_scene_values(region: Dict, exp_tiles: List):
+    """ Test get_scene_values() finds the Sentinel-2 tiles containing known locations. """
+    values = scene_index.get_scene_values('mgrs', region)
+    assert all([tile in values for tile in exp_tiles])
+    assert values == sorted(values)
+    # scenes should be near the region
+    assert 0 < len(values) < 20
+
+
+def test_get_scene_values_none():
+    """
+    Test get_scene_values() returns None for unsupported grids, regions with no client bounds, and regions that
+    intersect too many scenes.
+    """
+    assert scene_index.get_scene_values('unknown', _box(20.6, -33.9, 20.7, -33.8)) is None
+    assert scene_index.get_scene_values('mgrs', None) is None
+    assert scene_index.get_scene_values('mgrs', 'not a region') is None
+    assert scene_index.get_scene_values('mgrs', dict(_box(-180., -80., 180., 84.), geodesic=False)) is None
+
+
+def test_get_mgrs_band_bounds():
+    """ Test _get_mgrs_band_bounds() contains the tiles of each standard cell in the band. """
+    for band in ['C', 'M', 'N', 'X']:
+        band_bounds = scene_index._get_mgrs_band_bounds(band)
+        for zone in [1, 31, 60]:
+            _, tile_bounds = scene_index._get_mgrs_cell_tiles(zone, band, -186 + zone * 6, -180 + zone * 6)
+            central_lon = -183 + zone * 6
+            assert tile_bounds[:, 0].min() - central_lon == pytest.approx(band_bounds[0], abs=1e-3)
+            assert tile_bounds[:, 1].min() == pytest.approx(band_bounds[1], abs=1e-3)
+            assert tile_bounds[:, 2].max() - central_lon == pytest.approx(band_bounds[2], abs=1e-3)
+            assert tile_bounds[:, 3].max() == pytest.approx(band_bounds[3], abs=1e-3)
+
+
+@pytest.mark.parametrize(
+    'region, exp_bounds', [
+        (_box(0., 60., 90., 61.), (0., 60., 90., 68.5970)),
+        (_box(0., -61., 90., -60.), (0., -68.5970, 90., -60.)),
+        (dict(_box(0., 60., 90., 61.), geodesic=False), (0., 60., 90., 61.)),
+        (_box(20., -34., 21., -33.), (20., -34.0010, 21., -33.)),
+        (dict(type='Point', coordinates=[20., -34.]), (20., -34., 20., -34.)),
+        (dict(_box(0., 0., 1., 1.), crs=dict(type='name', properties=dict(name='EPSG:32634'))), None),
+        (_box(-179., 0., 179., 1.), None),
+        (dict(_box(-179., 0., 179., 1.), geodesic=False), (-179., 0., 179., 1.)),
+    ]
+)  # yapf: disable
+def test_get_region_bounds(region: Dict, exp_bounds: tuple):
+    """
+    Test _get_region_bounds() contains geodesic region edges, and is None for regions not in WGS84 or with geodesic
+    edges crossing the antimeridian.
+    """
+    bounds = scene_index._get_region_bounds(region)
+    if exp_bounds is None:
+        assert bounds is None
+    else:
+        assert bounds == pytest.approx(exp_bounds, abs=1e-4)
+
+
+def test_get_scene_filter():
+    """ Test get_scene_filter() builds the expected property filter. """
+    region = _box(2.3, 48.8, 2.4, 48.9)
+    scene_filter = scene_index.get_scene_filter('mgrs', region)
+    exp_filter = ee.Filter.inList('MGRS_TILE', scene_index.get_scene_values('mgrs', region))
+    assert scene_filter.serialize() == exp_filter.serialize()
+
+    # regions with no scenes, or too many scenes are not filtered
+    assert scene_index.get_scene_filter('unknown', region) is None
+    assert scene_index.get_scene_filter('mgrs', dict(_box(-180., -80., 180., 84.), geodesic=False)) is None
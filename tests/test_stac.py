@@ -13,9 +13,15 @@
     See the License for the specific language governing permissions and
     limitations under the License.
 """
+import json
+import pathlib
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
 
 import pytest
+from geedim.cache import DiskCache
 from geedim.stac import StacCatalog, StacItem
 from geedim.utils import split_id
 
@@ -111,3 +117,151 @@ def test_stac_item_descriptions(image_id: str, stac_catalog: StacCatalog, reques
     assert stac_item.descriptions is not None
     assert len(stac_item.descriptions) > 0
     assert len(list(stac_item.descriptions.values())[0]) > 0
+
+
+class FakeResponse:
+    """ Minimal emulation of a ``requests.Response``. """
+
+    def __init__(self, status_code: int, item_dict: Dict = None, headers: Dict = None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self._item_dict = item_dict
+
+    def json(self) -> Dict:
+        return self._item_dict
+
+
+class FakeSession:
+    """ Emulation of a ``requests.Session`` that serves a fixed STAC dict with an ETag, and records requests. """
+
+    def __init__(self, item_dict: Dict, etag: str = '"1"', delay: float = 0):
+        self.item_dict = item_dict
+        self.etag = etag
+        self.delay = delay
+        self.requests = []
+
+    def get(self, url: str, headers: Dict = None) -> FakeResponse:
+        self.requests.append(headers or {})
+        time.sleep(self.delay)
+        if headers and headers.get('If-None-Match') == self.etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.item_dict, headers=dict(ETag=self.etag))
+
+
+@pytest.fixture
+def offline_stac_catalog(
+    stac_catalog: StacCatalog, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> StacCatalog:
+    """ The StacCatalog instance with empty memory and disk caches, and a fake session. """
+    monkeypatch.setenv('GEEDIM_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(stac_catalog, '_disk_cache', DiskCache('stac'))
+    monkeypatch.setattr(stac_catalog, '_node_cache', DiskCache('stac_nodes'))
+    monkeypatch.setattr(stac_catalog, '_cache', {})
+    monkeypatch.setattr(stac_catalog, '_items', {})
+    item_dict = dict(id='COPERNICUS/S2_SR', summaries={'eo:bands': [dict(name='B1', center_wavelength=0.44)]})
+    monkeypatch.setattr(stac_catalog, '_session', FakeSession(item_dict))
+    return stac_catalog
+
+
+def test_item_memoized(offline_stac_catalog: StacCatalog):
+    """ Test get_item() returns the same StacItem instance on repeat calls, with a single request. """
+    stac_item = offline_stac_catalog.get_item('COPERNICUS/S2_SR/20220101T000000_20220101T000000_T00AAA')
+    assert stac_item is not None
+    assert stac_item.band_props['B1']['center_wavelength'] == 0.44
+    assert offline_stac_catalog.get_item('COPERNICUS/S2_SR') is stac_item
+    assert len(offline_stac_catalog._session.requests) == 1
+
+
+def test_single_flight(offline_stac_catalog: StacCatalog):
+    """ Test concurrent get_item_dict() calls for the same collection make a single request. """
+    offline_stac_catalog._session.delay = 0.1
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        item_dicts = list(executor.map(offline_stac_catalog.get_item_dict, ['COPERNICUS/S2_SR'] * 8))
+    assert all(item_dict == item_dicts[0] for item_dict in item_dicts)
+    assert len(offline_stac_catalog._session.requests) == 1
+
+
+def test_disk_cache_revalidate(offline_stac_catalog: StacCatalog, monkeypatch: pytest.MonkeyPatch):
+    """ Test STAC dicts are read from the disk cache, and revalidated with a conditional request once stale. """
+    session = offline_stac_catalog._session
+    item_dict = offline_stac_catalog.get_item_dict('COPERNICUS/S2_SR')
+    assert len(session.requests) == 1
+
+    # a new process is emulated by clearing the memory cache: the disk cache should be used without a request
+    monkeypatch.setattr(offline_stac_catalog, '_cache', {})
+    assert offline_stac_catalog.get_item_dict('COPERNICUS/S2_SR') == item_dict
+    assert len(session.requests) == 1
+
+    # once the disk cache is stale, a conditional request should be made, and the cached dict used on 304
+    monkeypatch.setattr(offline_stac_catalog, '_cache', {})
+    monkeypatch.setattr(offline_stac_catalog, '_revalidate_interval', 0)
+    assert offline_stac_catalog.get_item_dict('COPERNICUS/S2_SR') == item_dict
+    assert len(session.requests) == 2
+    assert session.requests[-1]['If-None-Match'] == session.etag
+
+
+def test_disk_cache_disabled(offline_stac_catalog: StacCatalog, tmp_path: pathlib.Path):
+    """ Test enable_cache() disables and enables the STAC disk caches. """
+    offline_stac_catalog.enable_cache(False)
+    assert offline_stac_catalog._disk_cache is None and offline_stac_catalog._node_cache is None
+    assert offline_stac_catalog.get_item_dict('COPERNICUS/S2_SR') is not None
+    assert list(tmp_path.glob('*.sqlite')) == []
+
+    offline_stac_catalog.enable_cache()
+    assert offline_stac_catalog._disk_cache is not None and offline_stac_catalog._node_cache is not None
+
+
+class FakeTreeSession:
+    """ Emulation of a ``requests.Session`` that serves a small STAC tree with ETags, and records requested URLs. """
+
+    def __init__(self):
+        self.nodes = {
+            'root': dict(type='Catalog', links=[dict(rel='child', href='cat'), dict(rel='parent', href='x')]),
+            'cat': dict(type='Catalog', links=[dict(rel='child', href=f'leaf{i}') for i in range(3)]),
+            'leaf0': {'type': 'Collection', 'id': 'A/B', 'gee:type': 'image_collection'},
+            'leaf1': {'type': 'Collection', 'id': 'A/C', 'gee:type': 'image'},
+            'leaf2': {'type': 'Collection', 'id': 'A/D', 'gee:type': 'table'},
+        }
+        self.versions = {}
+        self.requests = []
+
+    def get(self, url: str, headers: Dict = None) -> FakeResponse:
+        self.requests.append(url)
+        etag = f'{url}:{self.versions.get(url, 0)}'
+        if headers and headers.get('If-None-Match') == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.nodes[url], headers=dict(ETag=etag))
+
+
+def test_traverse_stac_incremental(stac_catalog: StacCatalog, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    """ Test _traverse_stac() finds image leaf nodes, and skips unchanged leaf nodes on a repeat traversal. """
+    monkeypatch.setenv('GEEDIM_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(stac_catalog, '_node_cache', DiskCache('stac_nodes'))
+    session = FakeTreeSession()
+    monkeypatch.setattr(stac_catalog, '_session', session)
+
+    url_dict = stac_catalog._traverse_stac('root', {})
+    assert url_dict == {'A/B': 'leaf0', 'A/C': 'leaf1'}
+    assert sorted(session.requests) == sorted(session.nodes.keys())
+
+    # catalog nodes should be revalidated, and leaf nodes read from the node cache
+    session.requests = []
+    assert stac_catalog._traverse_stac('root', {}) == url_dict
+    assert sorted(session.requests) == ['cat', 'root']
+
+    # a changed catalog node should have its leaf nodes revalidated
+    session.requests = []
+    session.nodes['cat']['links'] = session.nodes['cat']['links'][:1]
+    session.versions['cat'] = 1
+    assert stac_catalog._traverse_stac('root', {}) == {'A/B': 'leaf0'}
+    assert sorted(session.requests) == ['cat', 'leaf0', 'root']
+
+
+def test_write_url_dict(stac_catalog: StacCatalog, tmp_path: pathlib.Path):
+    """ Test write_url_dict() writes url_dict, and leaves no temporary files. """
+    filename = tmp_path.joinpath('ee_stac_urls.json')
+    stac_catalog.write_url_dict(filename)
+    with open(filename, 'r') as f:
+        assert json.load(f) == stac_catalog.url_dict
+    assert list(tmp_path.iterdir()) == [filename]
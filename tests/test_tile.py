@@ -14,6 +14,7 @@
     limitations under the License.
 """
 from collections import namedtuple
+from threading import Event, Thread
 
 import ee
 import numpy as np
@@ -62,3 +63,53 @@ def test_download(base_image_like, session):
     for i in range(3):
         assert np.all(array[i] == i + 1)
     assert bar.n == pytest.approx(raw_download_size, rel=0.01)
+
+
+def test_download_stop():
+    """ Test that a tile download returns None without requesting a download url, when `stop_event` is set. """
+    exp_image = BaseImageLike(None, 'EPSG:3857', Affine.identity(), (10, 10), 3, 'uint8')
+    tile = Tile(exp_image, Window(0, 0, 10, 10))
+    stop_event = Event()
+    stop_event.set()
+    assert tile.download(stop_event=stop_event) is None
+
+
+def test_download_stop_waiting():
+    """
+    Test that a tile download waiting on the getDownloadURL() lock returns None without requesting a download url,
+    when `stop_event` is set while it waits.
+    """
+
+    class FakeImage:
+        def __init__(self):
+            self.calls = 0
+
+        def getDownloadURL(self, *args, **kwargs):
+            self.calls += 1
+            return 'url'
+
+    exp_image = BaseImageLike(FakeImage(), 'EPSG:3857', Affine.identity(), (10, 10), 3, 'uint8')
+    tile = Tile(exp_image, Window(0, 0, 10, 10))
+    stop_event = Event()
+    results = []
+    with Tile._ee_lock:
+        thread = Thread(target=lambda: results.append(tile.download(stop_event=stop_event)))
+        thread.start()
+        thread.join(timeout=0.1)
+        stop_event.set()
+    thread.join()
+    assert results == [None]
+    assert exp_image.ee_image.calls == 0
+
+
+def test_download_bands(base_image_like):
+    """ Test downloading a band group of the synthetic image tile.  """
+    window = Window(0, 0, *base_image_like.shape[::-1])
+    tile = Tile(base_image_like, window, bands=(1, 2))
+    assert tile.indexes == [2, 3]
+    array = tile.download()
+
+    assert array is not None
+    assert array.shape == (2, *base_image_like.shape)
+    for i in range(2):
+        assert np.all(array[i] == i + 2)